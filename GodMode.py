@@ -17,6 +17,8 @@ from selenium.common.exceptions import (
 import undetected_chromedriver as uc
 import pandas as pd
 
+from popup_guard import install_popup_guard
+
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -44,6 +46,7 @@ class MarianosScraper:
         self.driver: Optional[Chrome] = None
         self.product_links: List[str] = []
         self.unique_product_links: set = set()
+        self.popup_guard_installed = False
 
     @staticmethod
     def _generate_user_agent() -> str:
@@ -95,6 +98,11 @@ class MarianosScraper:
             logger.warning(f"Error handling Qualtrics popup: {e}")
             return False
 
+    async def dismiss_popup_if_unguarded(self):
+        # Only poll for the popup when the in-page watcher could not be installed
+        if not self.popup_guard_installed:
+            await self.dismiss_qualtrics_popup()
+
     async def type_like_human(self, element, text: str, delay: float = 0.2):
         for char in text:
             element.send_keys(char)
@@ -166,6 +174,7 @@ class MarianosScraper:
         try:
             options = self._setup_driver_options()
             self.driver = uc.Chrome(options=options)
+            self.popup_guard_installed = install_popup_guard(self.driver)
             logger.info("Driver setup complete")
             return self.driver
         except WebDriverException as e:
@@ -263,7 +272,7 @@ class MarianosScraper:
                 return []
             
             # Immediately try to dismiss any popup that might appear
-            await self.dismiss_qualtrics_popup()
+            await self.dismiss_popup_if_unguarded()
             
             # Select store if zip code is provided
             if self.zip_code:
@@ -276,13 +285,13 @@ class MarianosScraper:
             page_loads = 0
             while page_loads < self.max_page_loads:
                 # Try to dismiss popup before each "Load More"
-                await self.dismiss_qualtrics_popup()
+                await self.dismiss_popup_if_unguarded()
                 
                 if not await self.click_load_more():
                     break
                 
                 # Try to dismiss popup after "Load More"
-                await self.dismiss_qualtrics_popup()
+                await self.dismiss_popup_if_unguarded()
                 
                 new_links = self.extract_product_links()
 
@@ -1,6 +1,9 @@
 import asyncio
+import os
 import random
 import logging
+import socket
+import time
 from typing import List, Optional, Dict
 
 from selenium.webdriver import Chrome
@@ -19,6 +22,25 @@ import undetected_chromedriver as uc
 import pandas as pd
 
 from config import PRODUCT_CATEGORIES, SCRAPER_CONFIG
+from browser_health import BrowserHealthMonitor
+from driver_factory import DriverFactory, startup_summary
+from dom_pruning import harvest_links, prune_harvested_cells
+from pager import PageTask, build_category_url, build_search_url, page_tasks, read_page_count, resume_category_grid
+from search_capture import SearchResponseCapture
+from store_session import StoreSessionCache
+from rate_control import ThrottledError, is_throttled_page, shared_rate_controller
+from circuit_breaker import shared_circuit_breaker
+from popup_guard import install_popup_guard
+from retry_policy import configure_budget, retrying
+from settings import apply_settings, load_settings
+from output_sink import write_output
+from product_urls import canonical_product_url, product_key
+from sitemap_discovery import discover_from_sitemaps, merge_into_catalog
+from department_tree import walk_department_tree
+from stopping_policy import yield_stop_policy
+from seen_set import SeenLinkSet
+from work_queue import LeaseKeeper, Task, open_work_queue
+from driver_supervisor import CrashSupervisor
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -27,6 +49,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+configure_budget(SCRAPER_CONFIG['retry_budget_per_minute'])
+
+# Blocked when block_resources is on; the grid and detail pages only need HTML, JS and XHR
+BLOCKED_RESOURCE_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg',
+    '*.woff', '*.woff2', '*.ttf', '*.mp4', '*.webm',
+    '*doubleclick.net*', '*google-analytics.com*', '*googletagmanager.com*'
+]
+
 class MarianosScraper:
     def __init__(
         self, 
@@ -35,13 +66,15 @@ class MarianosScraper:
         headless: bool = False,
         timeout: int = 30,
         zip_code: Optional[str] = None,
-        proxies: Optional[List[Dict[str, str]]] = None
+        proxies: Optional[List[Dict[str, str]]] = None,
+        store_id: Optional[str] = None
     ):
         self.base_url = base_url
         self.user_agent = user_agent or self._generate_user_agent()
         self.headless = headless
         self.timeout = timeout
         self.zip_code = zip_code
+        self.store_id = store_id or SCRAPER_CONFIG['store_id']
         self.driver: Optional[Chrome] = None
         self.all_product_links: List[str] = []
         self.unique_product_links: set = set()
@@ -50,12 +83,49 @@ class MarianosScraper:
         self.proxies = proxies or []
         self.current_proxy = None
 
+        self.health_monitor = BrowserHealthMonitor(
+            heap_limit_mb=SCRAPER_CONFIG['heap_limit_mb'],
+            dom_node_limit=SCRAPER_CONFIG['dom_node_limit'],
+            check_interval=SCRAPER_CONFIG['health_check_interval']
+        )
+
+        self.driver_factory = DriverFactory(
+            version_main=SCRAPER_CONFIG['chrome_version_main'],
+            cache_dir=SCRAPER_CONFIG['driver_cache_dir']
+        )
+
+        # One controller per process, shared by every scraper instance
+        self.popup_guard_installed = False
+        self.rate = shared_rate_controller(SCRAPER_CONFIG)
+        self.breaker = shared_circuit_breaker(SCRAPER_CONFIG)
+
+        self.store_sessions = StoreSessionCache(
+            cache_dir=SCRAPER_CONFIG['store_session_dir'],
+            max_age_hours=SCRAPER_CONFIG['store_session_max_age_hours'],
+            element_wait=SCRAPER_CONFIG['element_wait']
+        )
+
+        self.search_capture: Optional[SearchResponseCapture] = None
+        if SCRAPER_CONFIG['capture_search_responses']:
+            self.search_capture = SearchResponseCapture()
+
+        self.supervisor = CrashSupervisor(
+            SCRAPER_CONFIG['max_driver_restarts'],
+            reset_after=SCRAPER_CONFIG['driver_restart_reset_seconds']
+        )
+
+        self.seen_links: Optional[SeenLinkSet] = None
+        if SCRAPER_CONFIG['seen_set_dir']:
+            self.seen_links = SeenLinkSet(SCRAPER_CONFIG['seen_set_dir'])
+
     @staticmethod
     def _generate_user_agent() -> str:
+        # Claim the Chrome major version the driver is pinned to, so the UA agrees with navigator and client hints
+        version = f"{SCRAPER_CONFIG['chrome_version_main']}.0.0.0"
         user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36"
+            f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{version} Safari/537.36",
+            f"Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{version} Safari/537.36",
+            f"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{version} Safari/537.36"
         ]
         return random.choice(user_agents)
 
@@ -84,6 +154,9 @@ class MarianosScraper:
         
         if self.headless:
             options.add_argument("--headless")
+
+        if self.search_capture:
+            self.search_capture.configure_options(options)
         
         return options
 
@@ -103,51 +176,19 @@ class MarianosScraper:
         logger.info(f"Rotating to proxy: {self.current_proxy['http']}")
         return self.current_proxy
 
-    async def setup_driver(self) -> Optional[Chrome]:
-        max_attempts = 3
-        for attempt in range(max_attempts):
-            try:
-                # Rotate proxy for each driver setup attempt
-                if self.proxies:
-                    self._rotate_proxy()
-                
-                options = self._setup_driver_options()
-                self.driver = uc.Chrome(options=options)
-                
-                # Additional CDP detection evasion
-                self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                    "userAgent": self.user_agent,
-                    "platform": "Windows"
-                })
-                
-                # Modify navigator.webdriver property
-                self.driver.execute_script("""
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    });
-                """)
-                
-                logger.info("Driver setup complete")
-                return self.driver
-            
-            except WebDriverException as e:
-                logger.error(f"Error setting up undetectable webdriver (Attempt {attempt + 1}): {e}")
-                
-                if attempt == max_attempts - 1:
-                    logger.error("Failed to setup driver after maximum attempts")
-                    return None
-                
-                await asyncio.sleep(random.uniform(3, 7))
-        
-        return None
+    async def wait_for(self, condition, timeout: float):
+        # WebDriverWait polls synchronously; waiting in a thread keeps other sessions on the loop running
+        return await asyncio.to_thread(WebDriverWait(self.driver, timeout).until, condition)
 
     async def dismiss_qualtrics_popup(self) -> bool:
         try:
-            popup = WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((By.XPATH, "//div[contains(text(), 'We want to hear from you!')]"))
+            popup = await self.wait_for(
+                EC.presence_of_element_located((By.XPATH, "//div[contains(text(), 'We want to hear from you!')]")),
+                5
             )
-            no_thanks_button = WebDriverWait(self.driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'No, thanks')]"))
+            no_thanks_button = await self.wait_for(
+                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'No, thanks')]")),
+                5
             )
 
             self.driver.execute_script("arguments[0].click();", no_thanks_button)
@@ -166,6 +207,11 @@ class MarianosScraper:
             logger.warning(f"Error handling Qualtrics popup: {e}")
             return False
 
+    async def dismiss_popup_if_unguarded(self):
+        # Only poll for the popup when the in-page watcher could not be installed
+        if not self.popup_guard_installed:
+            await self.dismiss_qualtrics_popup()
+
     async def type_like_human(self, element, text: str, delay: float = 0.2):
         for char in text:
             element.send_keys(char)
@@ -176,55 +222,73 @@ class MarianosScraper:
             logger.warning("No zip code provided for store selection")
             return False
 
+        # apply refreshes the page and waits on the header, so it runs in a thread like the other Selenium calls
+        if SCRAPER_CONFIG['fast_store_selection'] and await asyncio.to_thread(self.store_sessions.apply, self.driver, self.store_id):
+            return True
+
+        # The modality dialog is the fallback; a successful run refreshes the cached session
+        store_selected = await self.select_store_via_ui()
+        if store_selected and SCRAPER_CONFIG['fast_store_selection']:
+            await asyncio.to_thread(self.store_sessions.capture, self.driver, self.store_id)
+        return store_selected
+
+    async def select_store_via_ui(self) -> bool:
         try:
             logger.info("Starting store selection process...")
 
-            location_button = WebDriverWait(self.driver, self.timeout).until(
-                EC.element_to_be_clickable((By.ID, "CurrentModality-button-A11Y-FOCUS-ID"))
+            location_button = await self.wait_for(
+                EC.element_to_be_clickable((By.ID, "CurrentModality-button-A11Y-FOCUS-ID")),
+                self.timeout
             )
             location_button.click()
             await asyncio.sleep(random.uniform(5, 10))
 
             try:
-                cancel_icon = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "ModalitySelector--CloseButton"))
+                cancel_icon = await self.wait_for(
+                    EC.element_to_be_clickable((By.ID, "ModalitySelector--CloseButton")),
+                    10
                 )
                 cancel_icon.click()
                 await asyncio.sleep(random.uniform(2, 5))
             except Exception:
                 logger.info("No cancel icon found or could not click it")
 
-            location_button = WebDriverWait(self.driver, self.timeout).until(
-                EC.element_to_be_clickable((By.ID, "CurrentModality-button-A11Y-FOCUS-ID"))
+            location_button = await self.wait_for(
+                EC.element_to_be_clickable((By.ID, "CurrentModality-button-A11Y-FOCUS-ID")),
+                self.timeout
             )
             location_button.click()
             await asyncio.sleep(random.uniform(5, 10))
 
-            change_store_button = WebDriverWait(self.driver, self.timeout).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, '[data-testid="ModalityOption-Button-PICKUP"]'))
+            change_store_button = await self.wait_for(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, '[data-testid="ModalityOption-Button-PICKUP"]')),
+                self.timeout
             )
             change_store_button.click()
             logger.info("Clicked on the change store button")
 
-            zip_search_input = WebDriverWait(self.driver, self.timeout).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="PostalCodeSearchBox-input"]'))
+            zip_search_input = await self.wait_for(
+                EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="PostalCodeSearchBox-input"]')),
+                self.timeout
             )
             zip_search_input.clear()
             
             await self.type_like_human(zip_search_input, self.zip_code)
             logger.info(f"Typed the zip code: {self.zip_code}")
 
-            search_icon = WebDriverWait(self.driver, self.timeout).until(
-                EC.element_to_be_clickable((By.XPATH, '//button[@aria-label="Search"]'))
+            search_icon = await self.wait_for(
+                EC.element_to_be_clickable((By.XPATH, '//button[@aria-label="Search"]')),
+                self.timeout
             )
             search_icon.click()
             logger.info("Clicked on the search icon")
 
-            store = WebDriverWait(self.driver, self.timeout).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, '[data-testid="SelectStore-53100516"]'))
+            store = await self.wait_for(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, f'[data-testid="SelectStore-{self.store_id}"]')),
+                self.timeout
             )
             store.click()
-            logger.info("Selected store successfully!")
+            logger.info(f"Selected store {self.store_id} successfully!")
 
             await asyncio.sleep(random.uniform(5, 10))
             return True
@@ -235,83 +299,127 @@ class MarianosScraper:
 
     async def setup_driver(self) -> Optional[Chrome]:
         try:
-            options = self._setup_driver_options()
-            self.driver = uc.Chrome(options=options)
+            async for attempt in retrying('driver_setup'):
+                with attempt:
+                    options = self._setup_driver_options()
+                    self.driver = await asyncio.to_thread(self.driver_factory.create, options)
+                    # Turns a hung driver.get into a TimeoutException instead of blocking forever
+                    self.driver.set_page_load_timeout(SCRAPER_CONFIG['page_load_timeout'])
+
             logger.info("Driver setup complete")
             return self.driver
-        except WebDriverException as e:
+        except (WebDriverException, OSError) as e:
             logger.error(f"Error setting up undetectable webdriver: {e}")
             return None
 
+    async def load_page(self, url: str, attempt_number: int = 1):
+        await self.breaker.before_request()
+        await self.rate.acquire()
+        logger.info(f"Visiting {url}... (Attempt {attempt_number})")
+        started = time.monotonic()
+
+        try:
+            await asyncio.to_thread(self.driver.get, url)
+
+            await self.wait_for(
+                lambda d: d.execute_script("return document.readyState") == "complete",
+                self.timeout
+            )
+
+            if is_throttled_page(self.driver.title):
+                self.rate.record_error(throttled=True)
+                raise ThrottledError(f"Throttled while loading {url}")
+
+        except Exception as e:
+            logger.warning(f"Error visiting {url}: {e}")
+            self.breaker.record_failure()
+            if not isinstance(e, ThrottledError):
+                self.rate.record_error()
+            raise
+
+        self.rate.record_success(time.monotonic() - started)
+        self.breaker.record_success()
+        logger.info(f"Successfully loaded {url}")
+
     async def visit_website(self, url: str, max_retries: int = 3) -> bool:
         if not self.driver:
             logger.error("Driver not initialized")
             return False
 
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Visiting {url}... (Attempt {attempt + 1})")
-                self.driver.get(url)
+        try:
+            async for attempt in retrying('page_load', max_attempts=max_retries):
+                with attempt:
+                    await self.load_page(url, attempt.retry_state.attempt_number)
+            return True
 
-                WebDriverWait(self.driver, self.timeout).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-                
-                logger.info(f"Successfully loaded {url}")
-                await asyncio.sleep(random.uniform(2, 5))
-                return True
-            
-            except Exception as e:
-                logger.warning(f"Error visiting {url}: {e}")
-                
-                if attempt == max_retries - 1:
-                    logger.error(f"Failed to load {url} after {max_retries} attempts")
-                    return False
-                
-                await asyncio.sleep(random.uniform(3, 7))
+        except Exception as e:
+            logger.error(f"Failed to load {url}: {e}")
+            return False
 
-    def extract_product_links(self) -> List[str]:
+    def extract_product_links(self) -> Optional[List[str]]:
+        # None means the grid could not be read, as opposed to a page whose links were all known already
         try:
-            product_containers = WebDriverWait(self.driver, self.timeout).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
-            )
+            if SCRAPER_CONFIG['prune_harvested_cells']:
+                # Waiting on every cell would return the whole grid, pruned cells included; one is enough here
+                WebDriverWait(self.driver, self.timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
+                )
+                new_links = harvest_links(self.driver)
+            else:
+                product_containers = WebDriverWait(self.driver, self.timeout).until(
+                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
+                )
+                new_links = [
+                    container.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
+                    for container in product_containers
+                ]
 
-            new_links = [
-                container.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
-                for container in product_containers
-            ]
+            unique_new_links = self.register_links(new_links)
 
-            unique_new_links = [
-                link for link in new_links 
-                if link not in self.unique_product_links
-            ]
-            
-            self.unique_product_links.update(unique_new_links)
-            self.all_product_links.extend(unique_new_links)
+            if SCRAPER_CONFIG['prune_harvested_cells']:
+                prune_harvested_cells(self.driver, SCRAPER_CONFIG['prune_keep_recent'])
             
             logger.info(f"Found {len(unique_new_links)} new product links")
             return unique_new_links
         
         except Exception as e:
             logger.error(f"Error extracting product links: {e}")
-            return []
+            return None
+
+    def grid_cell_count(self) -> int:
+        return self.driver.execute_script(
+            "return document.querySelectorAll('div[data-testid=\"auto-grid-cell\"]').length;"
+        )
 
     async def click_load_more(self) -> bool:
         try:
-            load_more_button = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button'))
-            )
-            self.driver.execute_script(
-                "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", 
-                load_more_button
-            )           
-            await asyncio.sleep(random.uniform(1.5, 3.5))
-            load_more_button.click()
+            # A missing button ends the category; only an intercepted or stale click is retried
+            async for attempt in retrying('load_more'):
+                with attempt:
+                    load_more_button = await self.wait_for(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button')),
+                        SCRAPER_CONFIG['element_wait']
+                    )
+                    self.driver.execute_script(
+                        "arguments[0].scrollIntoView({block: 'center'});", 
+                        load_more_button
+                    )
+                    await self.rate.acquire()
+                    cells_before = self.grid_cell_count()
+                    started = time.monotonic()
+                    load_more_button.click()
             logger.info("Clicked 'Load More' button")
-            await asyncio.sleep(random.uniform(5, 10))
-            WebDriverWait(self.driver, self.timeout).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )            
+
+            # The time until new cells render is the page latency the rate controller adapts to
+            try:
+                await self.wait_for(
+                    lambda d: self.grid_cell_count() > cells_before,
+                    self.timeout
+                )
+                self.rate.record_success(time.monotonic() - started)
+            except TimeoutException:
+                logger.warning("No new products appeared after clicking 'Load More'")
+                self.rate.record_error(throttled=is_throttled_page(self.driver.title))
             return True
         
         except (TimeoutException, NoSuchElementException):
@@ -322,51 +430,173 @@ class MarianosScraper:
             logger.warning(f"Error clicking 'Load More' button: {e}")
             return False
 
+    def register_links(self, links: List[str]) -> List[str]:
+        # Grid links carry ?fulfillment=... and captured ones may use another slug; keyed by UPC they count once
+        unique_new_links = []
+        for link in dict.fromkeys(canonical_product_url(link) for link in links if link):
+            key = product_key(link)
+            if key not in self.unique_product_links:
+                self.unique_product_links.add(key)
+                unique_new_links.append(link)
+
+        if self.seen_links:
+            # Links another process or an earlier run already saved are not handed out again;
+            # they are only recorded once main has persisted them
+            unique_new_links = self.seen_links.unseen(unique_new_links)
+
+        self.all_product_links.extend(unique_new_links)
+        return unique_new_links
+
+    def add_captured_links(self, records: List[Dict]) -> List[str]:
+        unique_new_links = self.register_links([record['Product Link'] for record in records])
+
+        logger.info(f"Found {len(unique_new_links)} new product links from search responses")
+        return unique_new_links
+
+    def collect_new_links(self) -> Optional[List[str]]:
+        # Response capture yields a whole batch of products per request; the DOM walk stays as fallback
+        if self.search_capture:
+            records = self.search_capture.drain(self.driver)
+            if records:
+                return self.add_captured_links(records)
+
+        return self.extract_product_links()
+
     async def search_category(self, category: str) -> bool:
         try:
+            if self.search_capture:
+                self.search_capture.enable(self.driver)
+
             try:
-                search_bar = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "SearchBar-input"))
+                search_bar = await self.wait_for(
+                    EC.element_to_be_clickable((By.ID, "SearchBar-input")),
+                    SCRAPER_CONFIG['element_wait']
                 )
                 search_bar.click()
                 logger.info("Clicked initial search bar")
             except Exception:
                 logger.warning("Could not click initial search bar")
 
-            search_input = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "SearchBar-input-open"))
+            search_input = await self.wait_for(
+                EC.presence_of_element_located((By.ID, "SearchBar-input-open")),
+                SCRAPER_CONFIG['element_wait']
             )
             search_input.clear()
             await self.type_like_human(search_input, category)
+            await self.breaker.before_request()
+            await self.rate.acquire()
+            started = time.monotonic()
             search_input.send_keys(Keys.RETURN)
             
             logger.info(f"Searched for category: {category}")
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['search_delay']))
 
-            WebDriverWait(self.driver, self.timeout).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
+            await self.wait_for(
+                lambda d: d.execute_script("return document.readyState") == "complete",
+                self.timeout
             )
+            await self.wait_for(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]')),
+                self.timeout
+            )
+            self.rate.record_success(time.monotonic() - started)
+            self.breaker.record_success()
             return True
         
         except Exception as e:
             logger.error(f"Error searching for category {category}: {e}")
+            self.rate.record_error()
+            self.breaker.record_failure()
+            return False
+
+    async def recycle_tab(self) -> bool:
+        try:
+            old_handle = self.driver.current_window_handle
+            self.driver.switch_to.new_window('tab')
+            new_handle = self.driver.current_window_handle
+
+            self.driver.switch_to.window(old_handle)
+            self.driver.close()
+            self.driver.switch_to.window(new_handle)
+            self.health_monitor.reset()
+            self.popup_guard_installed = install_popup_guard(self.driver)
+            self.block_heavy_resources()
+
+            logger.info("Recycled browser tab")
+            return await self.visit_website(self.base_url)
+
+        except WebDriverException as e:
+            logger.error(f"Error recycling browser tab: {e}")
+            return False
+
+    async def recycle_driver(self) -> bool:
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing WebDriver during recycle: {e}")
+
+        self.driver = None
+        self.health_monitor.reset()
+
+        if not await self.start_session():
             return False
 
+        logger.info("Recycled WebDriver")
+        return True
+
+    async def restore_grid_offset(self, category: str, page_loads: int) -> bool:
+        if self.search_capture:
+            self.search_capture.enable(self.driver)
+        return await resume_category_grid(self, category, page_loads)
+
+    async def recycle_browser(self, category: str, page_loads: int) -> bool:
+        # A fresh tab releases the renderer heap; fall back to a new driver if the browser stays bloated
+        recycled = await self.recycle_tab()
+        if not recycled or self.health_monitor.needs_recycle(self.driver):
+            recycled = await self.recycle_driver()
+
+        if not recycled:
+            return False
+
+        # Links already found stay in unique_product_links, so re-extraction only yields new ones
+        return await self.restore_grid_offset(category, page_loads)
+
+    async def recover_crashed_session(self, category: Optional[str] = None, page_loads: int = 0) -> bool:
+        # Ordinary failures leave the session alive and are handled by the caller as before
+        if not await self.supervisor.recover(self.driver, self.recycle_driver):
+            return False
+        if category is None:
+            return True
+        return await self.restore_grid_offset(category, page_loads)
+
     async def scrape_category(self, category: str) -> List[str]:
-        if not await self.search_category(category):
+        if not await self.search_category(category) and not await self.recover_crashed_session(category):
             return []
         
         category_links = []
         page_loads = 0
+        stop_policy = yield_stop_policy(SCRAPER_CONFIG)
         
         while page_loads < SCRAPER_CONFIG['max_page_loads_per_category']:
-            await self.dismiss_qualtrics_popup()
-            new_links = self.extract_product_links()
-            category_links.extend(new_links)
+            await self.dismiss_popup_if_unguarded()
+            known_links = len(self.unique_product_links)
+            new_links = await asyncio.to_thread(self.collect_new_links)
+            category_links.extend(new_links or [])
+
+            # Yield counts links new to this run, so a seen set from earlier runs does not end categories early
+            stop_policy.record(len(self.unique_product_links) - known_links)
+            if stop_policy.should_stop(category):
+                break
+
+            if self.health_monitor.due(page_loads) and self.health_monitor.needs_recycle(self.driver):
+                if not await self.recycle_browser(category, page_loads):
+                    logger.error(f"Could not resume category {category} after recycling the browser")
+                    break
+
             if not await self.click_load_more():
+                # A dead session resumes at the same offset; links already found are not handed out again
+                if await self.recover_crashed_session(category, page_loads):
+                    continue
                 break
-                
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['load_more_delay']))
             
             page_loads += 1
             logger.info(f"Loaded page {page_loads} for category {category}")
@@ -374,22 +604,74 @@ class MarianosScraper:
         logger.info(f"Finished scraping category {category}. Found {len(category_links)} links.")
         return category_links
 
+    async def discover_page_count(self, category: str, is_path: bool = False) -> int:
+        url = build_category_url(category) if is_path else build_search_url(category)
+        if not await self.visit_website(url):
+            return 0
+
+        page_count = await asyncio.to_thread(read_page_count, self.driver) or 1
+        logger.info(f"Category {category} has {page_count} pages")
+        return min(page_count, SCRAPER_CONFIG['max_page_loads_per_category'])
+
+    async def scrape_page(self, task: PageTask) -> Optional[List[str]]:
+        # A single attempt here; failed pages are re-queued on their own by the caller
+        if not await self.visit_website(task.url, max_retries=1):
+            return None
+
+        new_links = await asyncio.to_thread(self.extract_product_links)
+        if new_links is None:
+            return None
+
+        logger.info(f"Scraped page {task.page} for category {task.category}")
+        return new_links
+
+    def block_heavy_resources(self):
+        if not SCRAPER_CONFIG['block_resources']:
+            return
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCE_PATTERNS})
+            logger.info("Blocking images, fonts, media and trackers")
+        except WebDriverException as e:
+            logger.warning(f"Could not enable resource blocking: {e}")
+
+    async def start_session(self, require_store: bool = False) -> bool:
+        driver = await self.setup_driver()
+        if not driver:
+            return False
+
+        self.popup_guard_installed = install_popup_guard(self.driver)
+        self.block_heavy_resources()
+
+        if not await self.visit_website(self.base_url):
+            return False
+
+        await self.dismiss_popup_if_unguarded()
+
+        if self.zip_code:
+            store_selected = await self.select_store()
+            if not store_selected:
+                if require_store:
+                    logger.error(f"Failed to select store {self.store_id}")
+                    return False
+                logger.warning("Failed to select store, continuing anyway")
+
+        return True
+
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+                logger.info("WebDriver closed successfully")
+            except Exception as e:
+                logger.error(f"Error closing WebDriver: {e}")
+            self.driver = None
+
     async def scrape(self) -> List[str]:
         try:
-            driver = await self.setup_driver()
-            if not driver:
-                return []
-            
-            if not await self.visit_website(self.base_url):
+            if not await self.start_session():
                 return []
 
-            await self.dismiss_qualtrics_popup()
-            
-            if self.zip_code:
-                store_selected = await self.select_store()
-                if not store_selected:
-                    logger.warning("Failed to select store, continuing anyway")
-
             all_product_links = []
             for category in PRODUCT_CATEGORIES:
                 category_links = await self.scrape_category(category)
@@ -399,17 +681,152 @@ class MarianosScraper:
         
         except Exception as e:
             logger.error(f"Critical error during scraping: {e}")
-            return []
+            logger.info(f"Returning {len(self.all_product_links)} links found before the error")
+            return self.all_product_links
         
         finally:
-            if self.driver:
+            self.close()
+
+async def scrape_pages_parallel(categories: List[str], workers: int, is_path: bool = False, **scraper_kwargs) -> List[str]:
+    scrapers = [MarianosScraper(**scraper_kwargs) for _ in range(workers)]
+
+    try:
+        started = await asyncio.gather(*(scraper.start_session() for scraper in scrapers))
+        active = [scraper for scraper, ok in zip(scrapers, started) if ok]
+        if not active:
+            logger.error("No page worker could start a session")
+            return []
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for category in categories:
+            page_count = await active[0].discover_page_count(category, is_path)
+            for task in page_tasks(category, page_count, is_path):
+                queue.put_nowait(task)
+
+        logger.info(f"Queued {queue.qsize()} pages across {len(active)} workers")
+
+        async def worker(scraper: MarianosScraper):
+            while True:
+                task = await queue.get()
                 try:
-                    self.driver.quit()
-                    logger.info("WebDriver closed successfully")
-                except Exception as e:
-                    logger.error(f"Error closing WebDriver: {e}")
+                    # A worker that died here would leave its share of the queue unfinished and hang join()
+                    try:
+                        new_links = await scraper.scrape_page(task)
+                    except Exception as e:
+                        logger.error(f"Error scraping page {task.page} for category {task.category}: {e}")
+                        new_links = None
+
+                    if new_links is None:
+                        await scraper.recover_crashed_session()
+                        if task.attempts + 1 < SCRAPER_CONFIG['page_max_attempts']:
+                            queue.put_nowait(task._replace(attempts=task.attempts + 1))
+                        else:
+                            logger.error(f"Giving up on page {task.page} for category {task.category}")
+                finally:
+                    queue.task_done()
+
+        worker_tasks = [asyncio.create_task(worker(scraper)) for scraper in active]
+        await queue.join()
+        for worker_task in worker_tasks:
+            worker_task.cancel()
+
+        # Workers dedupe independently, so merge their links preserving discovery order
+        seen = set()
+        all_product_links = []
+        for scraper in active:
+            for link in scraper.all_product_links:
+                if link not in seen:
+                    seen.add(link)
+                    all_product_links.append(link)
+        return all_product_links
+
+    finally:
+        for scraper in scrapers:
+            scraper.close()
+
+async def scrape_pages_from_queue(categories: List[str], workers: int, work_queue, is_path: bool = False, **scraper_kwargs) -> List[str]:
+    # Every node enqueues the same categories; the queue collapses duplicates into one task each.
+    # Queue calls block on SQLite or Redis, so they run in threads like the Selenium calls do
+    await asyncio.to_thread(work_queue.enqueue, 'category', [{'category': category} for category in categories])
+    scrapers = [MarianosScraper(**scraper_kwargs) for _ in range(workers)]
+
+    try:
+        started = await asyncio.gather(*(scraper.start_session() for scraper in scrapers))
+        active = [scraper for scraper, ok in zip(scrapers, started) if ok]
+        if not active:
+            logger.error("No page worker could start a session")
+            return []
+
+        async def run_task(scraper: MarianosScraper, task: Task):
+            if task.kind == 'category':
+                page_count = await scraper.discover_page_count(task.payload['category'], is_path)
+                if page_count:
+                    tasks = page_tasks(task.payload['category'], page_count, is_path)
+                    await asyncio.to_thread(
+                        work_queue.enqueue, 'page', [{'category': t.category, 'page': t.page, 'url': t.url} for t in tasks]
+                    )
+                return page_count or None
+            # None when the grid could not be read, so the page is failed and re-leased instead of completed empty
+            return await scraper.scrape_page(PageTask(**task.payload))
+
+        def claim_next(worker_id: str) -> Optional[Task]:
+            return work_queue.claim(worker_id, 'category') or work_queue.claim(worker_id, 'page')
+
+        def work_left() -> bool:
+            counts = [work_queue.counts(kind) for kind in ('category', 'page')]
+            return any(count.get('leased') or count.get('pending') for count in counts)
+
+        async def worker(index: int, scraper: MarianosScraper):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+            while True:
+                task = await asyncio.to_thread(claim_next, worker_id)
+                if task is None:
+                    if not await asyncio.to_thread(work_left):
+                        return
+                    # Tasks leased elsewhere either finish or come back once their lease expires
+                    await asyncio.sleep(work_queue.lease_seconds / 4)
+                    continue
+
+                async with LeaseKeeper(work_queue, task, worker_id) as lease:
+                    try:
+                        result = await run_task(scraper, task)
+                    except Exception as e:
+                        logger.error(f"Worker {worker_id} failed on {task.kind} task {task.id}: {e}")
+                        result = None
+
+                if result is None:
+                    await asyncio.to_thread(work_queue.fail, task, worker_id, f"{task.kind} task returned no result")
+                    await scraper.recover_crashed_session()
+                elif not lease.lost:
+                    await asyncio.to_thread(work_queue.complete, task, worker_id, result)
+
+        await asyncio.gather(*(worker(index, scraper) for index, scraper in enumerate(active)))
+
+        # Results from every node are in the queue, so this returns the whole crawl's links
+        results = await asyncio.to_thread(work_queue.results, 'page')
+        return list(dict.fromkeys(link for links in results for link in links))
+
+    finally:
+        for scraper in scrapers:
+            scraper.close()
+
+async def scrape_departments(workers: int, **scraper_kwargs) -> List[str]:
+    # Leaf categories do not overlap, so their pages can be spread across workers without duplicate work
+    scraper = MarianosScraper(**scraper_kwargs)
+    try:
+        if not await scraper.start_session():
+            return []
+        leaves = await walk_department_tree(scraper, SCRAPER_CONFIG['department_max_depth'])
+    finally:
+        scraper.close()
+
+    return await scrape_pages_parallel([leaf.path for leaf in leaves], workers, is_path=True, **scraper_kwargs)
+
+async def main(argv: Optional[List[str]] = None):
+    settings = load_settings(argv)
+    apply_settings(settings)
+    configure_budget(settings.retry_budget_per_minute)
 
-async def main():
     try:
         # Configure proxies (you should replace these with actual working proxies)
         proxies = [
@@ -417,29 +834,62 @@ async def main():
             {"http": "http://proxy2.example.com:8080"},
             {"http": "http://proxy3.example.com:8080"}
         ]
-        
-        # Configure scraper with specific parameters
-        scraper = MarianosScraper(
-            headless=SCRAPER_CONFIG.get('headless', False),
-            zip_code=SCRAPER_CONFIG.get('zip_code'),
-            timeout=SCRAPER_CONFIG.get('timeout', 30),
+
+        scraper_kwargs = dict(
+            base_url=settings.base_url,
+            user_agent=settings.user_agent,
+            headless=settings.headless,
+            zip_code=settings.zip_code,
+            store_id=settings.store_id,
+            timeout=settings.timeout,
             proxies=proxies  # Add proxy list
         )
         
+        # Configure scraper with specific parameters
+        scraper = MarianosScraper(**scraper_kwargs)
+        
         # Run the scraper
-        product_links = await scraper.scrape()
+        if settings.discovery_mode == 'sitemap':
+            links = await discover_from_sitemaps(settings.base_url, settings.sitemap_concurrency)
+            product_links = merge_into_catalog(links, settings.catalog_file)
+        elif settings.discovery_mode == 'departments':
+            product_links = await scrape_departments(settings.page_workers, **scraper_kwargs)
+        elif settings.work_queue_url:
+            # Without an explicit run id, each day's crawl gets fresh tasks instead of finding yesterday's already done
+            run = settings.work_queue_run or time.strftime('%Y-%m-%d')
+            work_queue = open_work_queue(settings.work_queue_url, settings.lease_seconds, settings.page_max_attempts, run)
+            try:
+                product_links = await scrape_pages_from_queue(PRODUCT_CATEGORIES, settings.page_workers, work_queue, **scraper_kwargs)
+            finally:
+                work_queue.close()
+        elif settings.pagination_mode == 'direct':
+            product_links = await scrape_pages_parallel(PRODUCT_CATEGORIES, settings.page_workers, **scraper_kwargs)
+        else:
+            product_links = await scraper.scrape()
         
-        # Save results to CSV
+        # Save results to the configured sink
         if product_links:
-            df = pd.DataFrame({'product_link': product_links})
-            output_file = SCRAPER_CONFIG.get('output_file', 'marianos_product.csv')
-            df.to_csv(output_file, index=False)
-            logger.info(f"Saved {len(product_links)} product links to {output_file}")
+            if scraper.seen_links and settings.output_sink == 'csv':
+                # With a seen set the crawl returns only links no earlier run saved, so they extend the file
+                merge_into_catalog(product_links, settings.output_file)
+            else:
+                write_output(pd.DataFrame({'product_link': product_links}), settings.output_sink, settings.output_file, 'product_links')
+            if scraper.seen_links:
+                scraper.seen_links.add_new(product_links)
         else:
             logger.warning("No product links were found")
+
+        if scraper.search_capture and scraper.search_capture.records:
+            records = list(scraper.search_capture.records.values())
+            write_output(pd.DataFrame(records), settings.output_sink, 'marianos_search_products.csv', 'search_products')
     
     except Exception as e:
         logger.error(f"Unexpected error in main execution: {e}")
 
+    finally:
+        summary = startup_summary()
+        if summary:
+            logger.info(f"Driver startup times: {summary}")
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -21,6 +21,13 @@ import json
 import pandas as pd
 import undetected_chromedriver as uc
 
+from config import SCRAPER_CONFIG
+from product_records import ProductRecords
+from rate_control import ThrottledError, is_throttled_page, shared_rate_controller
+from retry_policy import retrying
+
+GRID_CELL_COUNT_SCRIPT = "return document.querySelectorAll('div[data-testid=\"auto-grid-cell\"]').length;"
+
 async def setup_driver(user_agent=None):
     try:
         options = uc.ChromeOptions()
@@ -41,16 +48,34 @@ async def setup_driver(user_agent=None):
         print(f"Error setting up undetectable WebDriver: {e}")
         return None
 
+async def load_page(driver, url):
+    # Paced by the shared rate controller; the load time it measures is what the rate adapts to
+    rate = shared_rate_controller(SCRAPER_CONFIG)
+    await rate.acquire()
+    started = time.monotonic()
+    try:
+        driver.get(url)
+        WebDriverWait(driver, SCRAPER_CONFIG['timeout']).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+    except WebDriverException:
+        rate.record_error()
+        raise
+
+    if is_throttled_page(driver.title):
+        rate.record_error(throttled=True)
+        raise ThrottledError(f"Throttled while loading {url}")
+    rate.record_success(time.monotonic() - started)
+
 async def visit_website(driver, url, max_retries=3):
     retries = 0
     while retries < max_retries:
         try:
             print(f"Visiting {url}... (Attempt {retries + 1})")
-            driver.get(url)
-            await asyncio.sleep(10)
+            await load_page(driver, url)
             print(f"Successfully loaded {url}")
             return
-        except WebDriverException as e:
+        except (WebDriverException, ThrottledError) as e:
             print(f"Error visiting {url}: {e}")
             retries += 1
             if retries < max_retries:
@@ -125,101 +150,82 @@ async def select_store(driver, zip_code):
         print(f"An error occurred: {e}")
 
 async def get_product_links(driver, max_retries=3):
+    rate = shared_rate_controller(SCRAPER_CONFIG)
     try:
-        retries = 0
-        product_links = []
-        
-        while retries < max_retries:
-            try:
+        async for attempt in retrying('grid_links', max_attempts=max_retries):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    driver.refresh()
+                    print(f"Page refreshed. Retry {attempt.retry_state.attempt_number - 1}/{max_retries - 1}.")
+
                 # Wait for product grid containers to load
                 print("Waiting for product grid containers...")
-                WebDriverWait(driver, 30).until(
+                product_grid_containers = WebDriverWait(driver, 30).until(
                     EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
                 )
-
-                # Fetch product containers
-                product_grid_containers = driver.find_elements(By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]')
                 
                 # Extract product links
                 product_links = [
                     container.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
                     for container in product_grid_containers
                 ]
-                
-                if product_links:
-                    print(f"Found {len(product_links)} product links in current page.")
-                    return product_links
-                else:
-                    print("No product links found. Retrying...")
-                    retries += 1
-                    # Introduce a random human-like delay
-                    time.sleep(random.uniform(2, 5))
-                    driver.refresh()  # Refresh the page
-                    print(f"Page refreshed. Retry {retries}/{max_retries}.")
-            except Exception as e:
-                print(f"Error retrieving product links on attempt {retries + 1}: {e}")
-                retries += 1
-                time.sleep(random.uniform(2, 5))
-                driver.refresh()
-        
-        print("Max retries reached. No product links found.")
-        return product_links  # Return the empty list if retries are exhausted
+
+                if not product_links:
+                    raise NoSuchElementException("No product links found")
+
+        print(f"Found {len(product_links)} product links in current page.")
+        return product_links
     except Exception as e:
-        print(f"Critical error in get_product_links: {e}")
+        print(f"Max retries reached. No product links found: {e}")
         return []
 
-async def click_load_more(driver, max_retries=3, initial_wait=10, backoff_factor=2):
-    for attempt in range(max_retries + 1):
-        try:
-            print(f"Attempt {attempt + 1} to click 'Load More' button...")
-            load_more_button = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button'))
-            )
-            print("Load More button located.")
+async def click_load_more(driver, max_retries=3):
+    try:
+        # A missing button means the grid is exhausted; only an intercepted or stale click is retried
+        async for attempt in retrying('load_more', max_attempts=max_retries + 1):
+            with attempt:
+                print(f"Attempt {attempt.retry_state.attempt_number} to click 'Load More' button...")
+                load_more_button = WebDriverWait(driver, 15).until(
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button'))
+                )
+                print("Load More button located.")
 
-            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", load_more_button)
-            await asyncio.sleep(random.uniform(1.5, 3.5))
-            load_more_button.click()
-            print("Clicked 'Load More' button successfully.")
-            await asyncio.sleep(random.uniform(5, 10))
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", load_more_button)
+                await rate.acquire()
+                cells_before = driver.execute_script(GRID_CELL_COUNT_SCRIPT)
+                started = time.monotonic()
+                load_more_button.click()
+                print("Clicked 'Load More' button successfully.")
 
-            WebDriverWait(driver, 10).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
+        # The time until new cells render is the page latency the rate controller adapts to
+        try:
+            WebDriverWait(driver, SCRAPER_CONFIG['timeout']).until(
+                lambda d: d.execute_script(GRID_CELL_COUNT_SCRIPT) > cells_before
             )
+            rate.record_success(time.monotonic() - started)
             print("New content loaded successfully.")
-            return True
-
-        except (TimeoutException, ElementClickInterceptedException, NoSuchElementException) as e:
-            print(f"Error on attempt {attempt + 1}: {e}")
-            if attempt < max_retries:
-                wait_time = initial_wait * (backoff_factor ** attempt)
-                print(f"Retrying after {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
-                try:
-                    driver.refresh()
-                    await asyncio.sleep(random.uniform(5, 10))  # Wait for page reload
-                    WebDriverWait(driver, 10).until(
-                        lambda d: d.execute_script("return document.readyState") == "complete"
-                    )
-                    print("Page refreshed successfully.")
-                except Exception as refresh_error:
-                    print(f"Error refreshing the page: {refresh_error}")
-            else:
-                print("Max retries reached. 'Load More' button could not be clicked.")
-                return False
+        except TimeoutException:
+            print("No new products appeared after clicking 'Load More'")
+            rate.record_error(throttled=is_throttled_page(driver.title))
+        return True
 
-        except Exception as unexpected_error:
-            print(f"Unexpected error: {unexpected_error}")
-            return False
+    except (TimeoutException, NoSuchElementException) as e:
+        print(f"'Load More' button could not be clicked: {e}")
+        return False
 
-    return False
+    except Exception as unexpected_error:
+        print(f"Unexpected error: {unexpected_error}")
+        return False
 
-# List to store all product data
-product_data = []
+# Records for all scraped products
+product_data = ProductRecords()
 
 async def scrape_product_details(driver):
     try:
-        await asyncio.sleep(10)
+        # The name renders after readyState; wait for it instead of a fixed delay
+        WebDriverWait(driver, SCRAPER_CONFIG['element_wait']).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]'))
+        )
         
         # Get product details
         product_name = driver.find_element(By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]').text
@@ -281,9 +287,8 @@ async def process_links_in_new_tab(driver, links):
         for link in links:
             try:
                 print(f"Visiting link in new tab: {link}")
-                driver.get(link)
+                await load_page(driver, link)
                 await scrape_product_details(driver)
-                await asyncio.sleep(2)
             except Exception as e:
                 print(f"Error processing link {link}: {e}")
                 continue
@@ -293,7 +298,7 @@ async def process_links_in_new_tab(driver, links):
 
 def save_to_excel(data, filename="product_details.xlsx"):
     # Create DataFrame
-    df = pd.DataFrame(data)
+    df = data.to_dataframe()
     
     # Create Excel writer object with xlsxwriter engine
     writer = pd.ExcelWriter(filename, engine='xlsxwriter')
@@ -354,12 +359,10 @@ async def main():
             if product_links:
                 await process_links_in_new_tab(driver, product_links)
             
-            if not await click_load_more(driver, max_retries=3, initial_wait=10, backoff_factor=2):
+            if not await click_load_more(driver, max_retries=3):
                 print("No more products to load. Scraping completed.")
                 break
             
-            await asyncio.sleep(5)
-            
     finally:
         # Save all collected data to Excel file
         save_to_excel(product_data)
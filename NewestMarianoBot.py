@@ -15,6 +15,10 @@ from selenium.common.exceptions import (
     ElementClickInterceptedException
 )
 
+import config
+from product_records import ProductRecords
+from rate_control import is_throttled_page, shared_rate_controller
+
 # Configuration imports (simulated for this example)
 PRODUCT_CATEGORIES = [
     "Meat", "Seafood", "Produce", "Deli", "Bakery", 
@@ -24,18 +28,20 @@ PRODUCT_CATEGORIES = [
 
 SCRAPER_CONFIG = {
     'max_page_loads_per_category': 1000,
-    'search_delay': (5, 10),
-    'load_more_delay': (5, 10),
     'zip_code': '60610'
 }
 
+GRID_CELL_COUNT_SCRIPT = "return document.querySelectorAll('div[data-testid=\"auto-grid-cell\"]').length;"
+
 class MarianosScraperV2:
     def __init__(self, url="https://www.marianos.com", user_agent=None):
         self.url = url
         self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         self.driver = None
-        self.product_data = []
+        self.product_data = ProductRecords()
         self.timeout = 30
+        # Pacing comes from the controller every other scraper in the process shares
+        self.rate = shared_rate_controller(config.SCRAPER_CONFIG)
 
     async def setup_driver(self):
         try:
@@ -59,11 +65,17 @@ class MarianosScraperV2:
     async def visit_website(self):
         try:
             print(f"Visiting {self.url}...")
+            await self.rate.acquire()
+            started = time.monotonic()
             self.driver.get(self.url)
-            await asyncio.sleep(10)
+            WebDriverWait(self.driver, self.timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            self.rate.record_success(time.monotonic() - started)
             print(f"Successfully loaded {self.url}")
         except WebDriverException as e:
             print(f"Error visiting {self.url}: {e}")
+            self.rate.record_error()
             raise
 
     async def select_store(driver, zip_code):
@@ -145,19 +157,25 @@ class MarianosScraperV2:
             
             # Type category with human-like typing
             await self.type_like_human(search_input, category)
+            await self.rate.acquire()
+            started = time.monotonic()
             search_input.send_keys(Keys.RETURN)
             
             print(f"Searched for category: {category}")
             
-            # Wait for page to load
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['search_delay']))
+            # Wait for the grid itself rather than a fixed delay, and report how long it took
             WebDriverWait(self.driver, self.timeout).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
+            WebDriverWait(self.driver, self.timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
+            )
+            self.rate.record_success(time.monotonic() - started)
             
             return True
         except Exception as e:
             print(f"Error searching for category {category}: {e}")
+            self.rate.record_error()
             return False
 
     async def get_product_links(self):
@@ -182,9 +200,21 @@ class MarianosScraperV2:
             print(f"Error retrieving product links: {e}")
             return []
 
-    async def scrape_product_details(driver):
+    async def scrape_product_details(self, link):
+        driver = self.driver
         try:
-            await asyncio.sleep(10)
+            await self.rate.acquire()
+            started = time.monotonic()
+            driver.get(link)
+            try:
+                # The name renders after readyState; wait for it instead of a fixed delay
+                WebDriverWait(driver, self.timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]'))
+                )
+                self.rate.record_success(time.monotonic() - started)
+            except TimeoutException:
+                self.rate.record_error(throttled=is_throttled_page(driver.title))
+                raise
             
             # Get product details
             product_name = driver.find_element(By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]').text
@@ -221,8 +251,7 @@ class MarianosScraperV2:
             except NoSuchElementException:
                 image_url = "No image available"
 
-            # Append data to the global list
-            product_data.append({
+            self.product_data.append({
                 'UPC': upc,
                 'Category': category,
                 'Title': product_name,
@@ -242,14 +271,21 @@ class MarianosScraperV2:
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button'))
             )
             
-            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", load_more_button)
-            await asyncio.sleep(random.uniform(1.5, 3.5))
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", load_more_button)
+            await self.rate.acquire()
+            cells_before = self.driver.execute_script(GRID_CELL_COUNT_SCRIPT)
+            started = time.monotonic()
             load_more_button.click()
             
-            await asyncio.sleep(random.uniform(5, 10))
-            WebDriverWait(self.driver, 10).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )
+            # The time until new cells render is the page latency the rate controller adapts to
+            try:
+                WebDriverWait(self.driver, self.timeout).until(
+                    lambda d: d.execute_script(GRID_CELL_COUNT_SCRIPT) > cells_before
+                )
+                self.rate.record_success(time.monotonic() - started)
+            except TimeoutException:
+                print("No new products appeared after clicking 'Load More'")
+                self.rate.record_error(throttled=is_throttled_page(self.driver.title))
             
             return True
         except (TimeoutException, NoSuchElementException):
@@ -264,19 +300,25 @@ class MarianosScraperV2:
             # Get product links on current page
             product_links = await self.get_product_links()
             
-            # Scrape each product
-            for link in product_links:
-                await self.scrape_product_details(link)
+            # Scrape each product in a second tab so the grid and its Load More button stay in the main window
+            main_window = self.driver.current_window_handle
+            self.driver.execute_script("window.open('');")
+            self.driver.switch_to.window(self.driver.window_handles[-1])
+            try:
+                for link in product_links:
+                    await self.scrape_product_details(link)
+            finally:
+                self.driver.close()
+                self.driver.switch_to.window(main_window)
             
             # Try to load more products
             if not await self.click_load_more():
                 break
             
             page_loads += 1
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['load_more_delay']))
 
     async def save_to_excel(self, filename="product_details.xlsx"):
-        df = pd.DataFrame(self.product_data)
+        df = self.product_data.to_dataframe()
         
         writer = pd.ExcelWriter(filename, engine='xlsxwriter')
         df.to_excel(writer, index=False, sheet_name='Products')
@@ -0,0 +1,59 @@
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from catalog_db import day_key
+from price_history import MISSING_CENTS, RECORD_DTYPE, PriceHistory
+
+
+def synthetic_day(upcs: np.ndarray, stores: int, observed_at: int, rng: np.random.Generator) -> np.ndarray:
+    records = np.empty(len(upcs) * stores, dtype=RECORD_DTYPE)
+    records['upc'] = np.tile(upcs, stores)
+    records['store_id'] = np.repeat(np.arange(53100500, 53100500 + stores), len(upcs))
+    records['observed_at'] = observed_at
+    # Prices drift now and then; roughly one product in eight is on promotion
+    records['price_cents'] = rng.integers(99, 2500, len(records)) // 25 * 25
+    records['promo_cents'] = np.where(rng.random(len(records)) < 0.125, records['price_cents'] - 50, MISSING_CENTS)
+    return records
+
+
+def timed(label: str, query):
+    started = time.perf_counter()
+    df = query()
+    print(f"  {label:<16} {time.perf_counter() - started:7.3f}s  ({len(df)} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query times over a year of daily price snapshots")
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--stores', type=int, default=1)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    upcs = np.sort(rng.choice(10 ** 12, args.products, replace=False)).astype(np.int64)
+    root = tempfile.mkdtemp(prefix='price_history_bench_')
+    try:
+        history = PriceHistory(root)
+        first_day = datetime(2025, 1, 1, 9)
+        started = time.perf_counter()
+        for offset in range(args.days):
+            observed_at = int((first_day + timedelta(days=offset)).timestamp())
+            history.append_records(synthetic_day(upcs, args.stores, observed_at, rng), observed_at)
+        print(f"{args.days} days x {args.products} products x {args.stores} stores "
+              f"written in {time.perf_counter() - started:.1f}s")
+
+        start = day_key(first_day.date())
+        end = day_key((first_day + timedelta(days=args.days - 1)).date())
+        timed('latest', history.latest_prices)
+        timed('changes', lambda: history.price_changes(start, end))
+        timed('promos', lambda: history.promo_frequency(start, end))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
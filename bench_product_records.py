@@ -0,0 +1,51 @@
+import argparse
+import gc
+import random
+import tracemalloc
+
+from config import PRODUCT_CATEGORIES
+from product_records import ProductRecords
+
+LOCATIONS = [f"Aisle {n}" for n in range(1, 40)]
+
+
+def synthetic_products(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for n in range(count):
+        upc = f"{rng.randrange(10 ** 12):013d}"
+        # Fresh string objects per row, as Selenium's .text returns them
+        yield {
+            'UPC': f"#{upc}",
+            'Category': ''.join(rng.choice(PRODUCT_CATEGORIES)),
+            'Title': f"Product {n} {rng.random():.6f}",
+            'Location': ''.join(rng.choice(LOCATIONS)),
+            'Price': f"${rng.randrange(50, 2500) / 100:.2f}",
+            'Image URL': f"https://www.kroger.com/product/images/large/front/{upc}",
+            'Product Link': f"https://www.marianos.com/p/product-{n}/{upc}"
+        }
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    container = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del container
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory use of dict rows versus ProductRecords")
+    parser.add_argument('--products', type=int, default=100000)
+    args = parser.parse_args()
+
+    as_dicts = measure(lambda: list(synthetic_products(args.products)))
+    as_records = measure(lambda: ProductRecords(synthetic_products(args.products)))
+
+    print(f"{args.products} products")
+    print(f"  list of dicts:  {as_dicts / 2 ** 20:8.1f} MiB")
+    print(f"  ProductRecords: {as_records / 2 ** 20:8.1f} MiB ({as_records / as_dicts:.0%} of dicts)")
+
+if __name__ == "__main__":
+    main()
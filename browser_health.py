@@ -0,0 +1,74 @@
+import logging
+from typing import Dict, Optional
+
+from selenium.webdriver import Chrome
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserHealthMonitor:
+    """Samples JS heap and DOM node counts through CDP Performance.getMetrics."""
+
+    def __init__(
+        self,
+        heap_limit_mb: float = 1024,
+        dom_node_limit: int = 150000,
+        check_interval: int = 10
+    ):
+        self.heap_limit_mb = heap_limit_mb
+        self.dom_node_limit = dom_node_limit
+        self.check_interval = check_interval
+        self.last_metrics: Dict[str, float] = {}
+        self._enabled_for: Optional[str] = None
+
+    def _enable(self, driver: Chrome):
+        # Performance.enable is per target, so re-enable after a tab switch
+        handle = driver.current_window_handle
+        if self._enabled_for != handle:
+            driver.execute_cdp_cmd('Performance.enable', {})
+            self._enabled_for = handle
+
+    def sample(self, driver: Chrome) -> Dict[str, float]:
+        try:
+            self._enable(driver)
+            result = driver.execute_cdp_cmd('Performance.getMetrics', {})
+        except WebDriverException as e:
+            logger.warning(f"Could not read browser metrics: {e}")
+            return {}
+
+        metrics = {m['name']: m['value'] for m in result.get('metrics', [])}
+        self.last_metrics = {
+            'heap_mb': metrics.get('JSHeapUsedSize', 0) / (1024 * 1024),
+            'heap_total_mb': metrics.get('JSHeapTotalSize', 0) / (1024 * 1024),
+            'dom_nodes': metrics.get('Nodes', 0),
+            'listeners': metrics.get('JSEventListeners', 0)
+        }
+        return self.last_metrics
+
+    def due(self, page_loads: int) -> bool:
+        return page_loads > 0 and page_loads % self.check_interval == 0
+
+    def needs_recycle(self, driver: Chrome) -> bool:
+        metrics = self.sample(driver)
+        if not metrics:
+            return False
+
+        logger.info(
+            f"Browser health: heap {metrics['heap_mb']:.0f} MB, "
+            f"{metrics['dom_nodes']:.0f} DOM nodes, {metrics['listeners']:.0f} listeners"
+        )
+
+        if metrics['heap_mb'] > self.heap_limit_mb:
+            logger.warning(f"JS heap {metrics['heap_mb']:.0f} MB exceeds limit of {self.heap_limit_mb} MB")
+            return True
+
+        if metrics['dom_nodes'] > self.dom_node_limit:
+            logger.warning(f"DOM node count {metrics['dom_nodes']:.0f} exceeds limit of {self.dom_node_limit}")
+            return True
+
+        return False
+
+    def reset(self):
+        self._enabled_for = None
+        self.last_metrics = {}
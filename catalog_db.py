@@ -0,0 +1,174 @@
+import logging
+import re
+import sqlite3
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS locations (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    upc INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    category_id INTEGER REFERENCES categories(id),
+    image_url TEXT,
+    product_link TEXT
+);
+
+CREATE TABLE IF NOT EXISTS price_observations (
+    upc INTEGER NOT NULL,
+    store_id INTEGER NOT NULL,
+    observed_on INTEGER NOT NULL,
+    price_cents INTEGER,
+    promo_cents INTEGER,
+    location_id INTEGER REFERENCES locations(id),
+    PRIMARY KEY (upc, store_id, observed_on)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS price_observations_store_day
+    ON price_observations (store_id, observed_on);
+
+-- Recreated on open so databases made with an older definition pick up changes
+DROP VIEW IF EXISTS price_observations_full;
+
+CREATE VIEW price_observations_full AS
+SELECT
+    printf('%013d', o.upc) AS upc,
+    o.store_id,
+    o.observed_on,
+    p.title,
+    c.name AS category,
+    p.image_url,
+    o.price_cents,
+    o.promo_cents,
+    l.name AS location
+FROM price_observations o
+LEFT JOIN products p ON p.upc = o.upc
+LEFT JOIN categories c ON c.id = p.category_id
+LEFT JOIN locations l ON l.id = o.location_id;
+"""
+
+UPSERT_PRODUCT = """
+INSERT INTO products (upc, title, category_id, image_url, product_link)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(upc) DO UPDATE SET
+    title = excluded.title,
+    category_id = COALESCE(excluded.category_id, products.category_id),
+    image_url = COALESCE(excluded.image_url, products.image_url),
+    product_link = COALESCE(excluded.product_link, products.product_link)
+"""
+
+UPSERT_OBSERVATION = """
+INSERT INTO price_observations (upc, store_id, observed_on, price_cents, promo_cents, location_id)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(upc, store_id, observed_on) DO UPDATE SET
+    price_cents = excluded.price_cents,
+    promo_cents = excluded.promo_cents,
+    location_id = excluded.location_id
+"""
+
+
+def parse_upc(value) -> Optional[int]:
+    digits = re.sub(r'\D', '', str(value or ''))
+    return int(digits) if digits else None
+
+
+def parse_price_cents(value) -> Optional[int]:
+    match = re.search(r'(\d+)(?:\.(\d{1,2}))?', str(value or '').replace(',', ''))
+    if not match:
+        return None
+    cents = (match.group(2) or '0').ljust(2, '0')
+    return int(match.group(1)) * 100 + int(cents)
+
+
+def day_key(day: Optional[date] = None) -> int:
+    day = day or date.today()
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def _usable(value) -> Optional[str]:
+    # The scrapers use placeholder strings for missing fields
+    if not value or value in ("No image available", "Uncategorized", "Price Not Available"):
+        return None
+    return value
+
+
+class CatalogStore:
+    """Normalized SQLite store: one products row per UPC, compact per-store daily price observations."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._dimension_cache: Dict[str, Dict[str, int]] = {'categories': {}, 'locations': {}}
+
+    def _dimension_ids(self, table: str, names: Iterable[Optional[str]]) -> Dict[str, int]:
+        cache = self._dimension_cache[table]
+        missing = {name for name in names if name and name not in cache}
+        if missing:
+            self.conn.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(name,) for name in missing])
+            placeholders = ','.join('?' * len(missing))
+            cache.update(self.conn.execute(
+                f"SELECT name, id FROM {table} WHERE name IN ({placeholders})", list(missing)
+            ).fetchall())
+        return cache
+
+    def upsert_products(self, product_details: List[Dict]) -> int:
+        categories = self._dimension_ids('categories', (_usable(row.get('Category')) for row in product_details))
+
+        rows = []
+        for row in product_details:
+            upc = parse_upc(row.get('UPC'))
+            if upc is None or not row.get('Title'):
+                continue
+            rows.append((
+                upc,
+                row['Title'],
+                categories.get(_usable(row.get('Category'))),
+                _usable(row.get('Image URL')),
+                row.get('Product Link')
+            ))
+
+        with self.conn:
+            self.conn.executemany(UPSERT_PRODUCT, rows)
+        return len(rows)
+
+    def record_observations(self, rows: List[Dict], store_id, observed_on: Optional[int] = None) -> int:
+        observed_on = observed_on or day_key()
+        locations = self._dimension_ids('locations', (_usable(row.get('Location')) for row in rows))
+
+        observations = []
+        for row in rows:
+            upc = parse_upc(row.get('UPC'))
+            if upc is None:
+                continue
+            observations.append((
+                upc,
+                int(row.get('Store ID') or store_id),
+                observed_on,
+                parse_price_cents(row.get('Price')),
+                parse_price_cents(row.get('Promo Price')),
+                locations.get(_usable(row.get('Location')))
+            ))
+
+        with self.conn:
+            self.conn.executemany(UPSERT_OBSERVATION, observations)
+        return len(observations)
+
+    def ingest(self, product_details: List[Dict], store_id, observed_on: Optional[int] = None):
+        products = self.upsert_products(product_details)
+        observations = self.record_observations(product_details, store_id, observed_on)
+        logger.info(f"Stored {products} products and {observations} price observations")
+
+    def close(self):
+        self.conn.close()
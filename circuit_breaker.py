@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Opens when the page-load error rate over a sliding time window passes a threshold."""
+
+    def __init__(
+        self,
+        window_seconds: float = 120,
+        error_threshold: float = 0.5,
+        min_calls: int = 6,
+        open_seconds: float = 60,
+        max_open_seconds: float = 900,
+        probe_timeout: float = 90
+    ):
+        self.window_seconds = window_seconds
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.base_open_seconds = open_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.probe_timeout = probe_timeout
+
+        self.state = CLOSED
+        self.opened_until = 0.0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._probe_started: Optional[float] = None
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def error_rate(self) -> float:
+        self._trim(time.monotonic())
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def _open(self, reason: str):
+        self.state = OPEN
+        self.opened_until = time.monotonic() + self.open_seconds
+        self._probe_started = None
+        logger.warning(f"Circuit opened for {self.open_seconds:.0f}s: {reason}")
+
+    async def before_request(self):
+        # While open every worker parks here instead of burning timeouts against a failing site
+        while True:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return
+
+            if self.state == OPEN and now >= self.opened_until:
+                self.state = HALF_OPEN
+                self._probe_started = None
+
+            if self.state == HALF_OPEN:
+                probe_stale = self._probe_started is not None and now - self._probe_started > self.probe_timeout
+                if self._probe_started is None or probe_stale:
+                    self._probe_started = now
+                    logger.info("Circuit half-open, sending probe request")
+                    return
+
+            await asyncio.sleep(max(self.opened_until - now, 1.0) if self.state == OPEN else 1.0)
+
+    def record_success(self):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self.open_seconds = self.base_open_seconds
+            self._outcomes.clear()
+            logger.info("Probe succeeded, circuit closed")
+            return
+
+        self._outcomes.append((now, True))
+        self._trim(now)
+
+    def record_failure(self):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+            self._open("probe request failed")
+            return
+
+        self._outcomes.append((now, False))
+        self._trim(now)
+
+        if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+            rate = self.error_rate()
+            if rate >= self.error_threshold:
+                self._open(f"error rate {rate:.0%} over the last {self.window_seconds:.0f}s")
+
+
+_shared_breaker: Optional[CircuitBreaker] = None
+
+
+def shared_circuit_breaker(config: dict) -> CircuitBreaker:
+    global _shared_breaker
+    if _shared_breaker is None:
+        _shared_breaker = CircuitBreaker(
+            window_seconds=config['breaker_window_seconds'],
+            error_threshold=config['breaker_error_threshold'],
+            min_calls=config['breaker_min_calls'],
+            open_seconds=config['breaker_open_seconds'],
+            max_open_seconds=config['breaker_max_open_seconds']
+        )
+    return _shared_breaker
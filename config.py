@@ -13,10 +13,76 @@ PRODUCT_CATEGORIES = [
     "Frozen"
 ]
 
+# One entry per store to sweep; store_id is the number in the SelectStore-<id> tile
+STORES = [
+    {'name': 'Chicago', 'zip_code': '60610', 'store_id': '53100516'}
+]
+
 SCRAPER_CONFIG = {
+    'base_url': 'https://www.marianos.com/',
+    'user_agent': None,
+    'headless': False,
+    'timeout': 30,
+    'page_load_timeout': 60,
+    'max_driver_restarts': 5,
+    'driver_restart_reset_seconds': 1800,
+    'element_wait': 10,
+    'block_resources': False,
+    'output_sink': 'csv',
+    'output_file': 'marianos_product.csv',
+    'details_file': 'marianos_product_details.csv',
+    'log_level': 'INFO',
     'max_page_loads_per_category': 1000,
-    'search_delay': (5, 10),
-    'load_more_delay': (5, 10),
-    'zip_code': '60610'
+    'zip_code': '60610',
+    'store_id': '53100516',
+    'heap_limit_mb': 1024,
+    'dom_node_limit': 150000,
+    'health_check_interval': 10,
+    'prune_harvested_cells': False,
+    'prune_keep_recent': 24,
+    'pagination_mode': 'load_more',
+    'discovery_mode': 'search',
+    'department_max_depth': 4,
+    'sitemap_concurrency': 8,
+    'yield_window': 5,
+    'min_yield_per_click': 2.0,
+    'yield_grace_clicks': 3,
+    'category_time_budget_seconds': 1800,
+    'page_workers': 3,
+    'page_max_attempts': 3,
+    'capture_search_responses': False,
+    'chrome_version_main': 131,
+    'driver_cache_dir': '~/.cache/mariano/chromedriver',
+    'store_workers': 4,
+    'catalog_file': 'marianos_product.csv',
+    'store_prices_file': 'marianos_store_prices.csv',
+    'fast_store_selection': True,
+    'store_session_dir': '~/.cache/mariano/store_sessions',
+    'store_session_max_age_hours': 24,
+    'catalog_db': 'marianos_catalog.db',
+    'price_history_dir': 'price_history',
+    'snapshot_file': 'marianos_snapshot.csv',
+    'price_report_file': 'marianos_price_changes.xlsx',
+    'image_cache_dir': 'product_images',
+    'image_workers': 16,
+    'rate_ceiling': 1.0,
+    'rate_floor': 0.05,
+    'rate_initial': 0.2,
+    'rate_target_latency': 4.0,
+    'rate_burst': 2,
+    'breaker_window_seconds': 120,
+    'breaker_error_threshold': 0.5,
+    'breaker_min_calls': 6,
+    'breaker_open_seconds': 60,
+    'breaker_max_open_seconds': 900,
+    'retry_budget_per_minute': 30,
+    'pipelined_details': False,
+    'detail_workers': 2,
+    'link_queue_size': 200,
+    'seen_set_dir': None,
+    'work_queue_url': None,
+    'work_queue_run': None,
+    'lease_seconds': 120,
+    'browser_contexts': 8
 }
 
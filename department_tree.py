@@ -0,0 +1,84 @@
+import logging
+from typing import Dict, List, NamedTuple, Optional, Set
+from urllib.parse import urljoin, urlsplit
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# The "Shop All" entry Marianobot.py navigates to; it lists every department
+SHOP_ALL_PATH = '/products/start-my-cart'
+
+# Links inside the page body only; the header mega-menu repeats every department on every page
+CATEGORY_LINK_SELECTOR = 'main a[href^="/d/"], main a[href^="/pl/"], main a[href*="marianos.com/d/"], main a[href*="marianos.com/pl/"]'
+
+
+class DepartmentNode(NamedTuple):
+    path: str
+    depth: int
+    parent: Optional[str] = None
+
+
+def category_paths(driver) -> List[str]:
+    paths = []
+    for anchor in driver.find_elements(By.CSS_SELECTOR, CATEGORY_LINK_SELECTOR):
+        try:
+            href = anchor.get_attribute('href')
+        except StaleElementReferenceException:
+            continue
+        if href:
+            paths.append(urlsplit(href).path.rstrip('/'))
+    return list(dict.fromkeys(paths))
+
+
+async def walk_department_tree(scraper, max_depth: int = 4) -> List[DepartmentNode]:
+    """Breadth-first walk from Shop All; pages that link to no further categories are the leaves."""
+    frontier = [DepartmentNode(SHOP_ALL_PATH, 0)]
+    seen: Set[str] = {SHOP_ALL_PATH}
+    leaves: List[DepartmentNode] = []
+    parents: Dict[str, Optional[str]] = {SHOP_ALL_PATH: None}
+    branches: Dict[str, List[str]] = {}
+
+    def lineage(node: DepartmentNode) -> Set[str]:
+        # Ancestors and siblings are linked from most pages; they are not this page's subcategories
+        related = set(branches.get(node.parent, []))
+        path = node.parent
+        while path is not None:
+            related.add(path)
+            path = parents.get(path)
+        return related
+
+    while frontier:
+        node = frontier.pop(0)
+        if not await scraper.visit_website(urljoin(scraper.base_url, node.path)):
+            logger.warning(f"Could not open category page {node.path}, skipping its subtree")
+            continue
+
+        try:
+            children = [path for path in category_paths(scraper.driver) if path != node.path]
+        except WebDriverException as e:
+            logger.warning(f"Could not read category links on {node.path}: {e}")
+            continue
+
+        # Only a page without subcategories is a leaf. One whose subcategories were all reached through
+        # another branch is skipped, since emitting it too would scrape their products twice
+        related = lineage(node)
+        subcategories = [path for path in children if path not in related]
+        new_children = [path for path in subcategories if path not in seen]
+        if subcategories and not new_children:
+            logger.info(f"{node.path}: subcategories already queued from another branch, skipping")
+            continue
+        if not subcategories or node.depth >= max_depth:
+            if node.path != SHOP_ALL_PATH:
+                leaves.append(node)
+            continue
+
+        seen.update(new_children)
+        branches[node.path] = new_children
+        parents.update((path, node.path) for path in new_children)
+        frontier.extend(DepartmentNode(path, node.depth + 1, node.path) for path in new_children)
+        logger.info(f"{node.path}: {len(new_children)} subcategories")
+
+    logger.info(f"Department tree has {len(leaves)} leaf categories ({len(seen)} nodes visited)")
+    return leaves
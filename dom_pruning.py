@@ -0,0 +1,54 @@
+import logging
+from typing import List
+
+from selenium.webdriver import Chrome
+
+logger = logging.getLogger(__name__)
+
+GRID_CELL_SELECTOR = 'div[data-testid="auto-grid-cell"]'
+HARVESTED_ATTRIBUTE = 'data-harvested'
+
+# Reads links from cells not yet harvested and marks them, in a single round trip.
+# A cell whose anchor has not rendered yet stays unmarked, so the next pass reads it.
+HARVEST_SCRIPT = """
+const cells = document.querySelectorAll(arguments[0] + ':not([' + arguments[1] + '])');
+const links = [];
+for (const cell of cells) {
+    const anchor = cell.querySelector('a[href]');
+    if (anchor && anchor.href) {
+        links.push(anchor.href);
+        cell.setAttribute(arguments[1], '1');
+    }
+}
+return links;
+"""
+
+# Empties harvested cells but keeps the cell element itself so the grid container,
+# its scroll height and the Load More button stay exactly as the site rendered them.
+# The most recent cells are left alone in case the site re-renders the tail of the grid.
+PRUNE_SCRIPT = """
+const harvested = document.querySelectorAll(arguments[0] + '[' + arguments[1] + '="1"]');
+const keepFrom = Math.max(0, harvested.length - arguments[2]);
+let pruned = 0;
+for (let i = 0; i < keepFrom; i++) {
+    const cell = harvested[i];
+    const height = cell.offsetHeight;
+    cell.replaceChildren();
+    cell.style.height = height + 'px';
+    cell.style.contain = 'strict';
+    cell.setAttribute(arguments[1], 'pruned');
+    pruned++;
+}
+return pruned;
+"""
+
+
+def harvest_links(driver: Chrome) -> List[str]:
+    return driver.execute_script(HARVEST_SCRIPT, GRID_CELL_SELECTOR, HARVESTED_ATTRIBUTE) or []
+
+
+def prune_harvested_cells(driver: Chrome, keep_recent: int = 24) -> int:
+    pruned = driver.execute_script(PRUNE_SCRIPT, GRID_CELL_SELECTOR, HARVESTED_ATTRIBUTE, keep_recent) or 0
+    if pruned:
+        logger.info(f"Pruned {pruned} harvested grid cells")
+    return pruned
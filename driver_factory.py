@@ -0,0 +1,83 @@
+import logging
+import os
+import shutil
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import undetected_chromedriver as uc
+from selenium.webdriver import Chrome
+
+from locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+STARTUP_TIMES: Dict[str, List[float]] = {'cold': [], 'warm': []}
+
+
+def startup_summary() -> Dict[str, float]:
+    summary = {}
+    for kind, times in STARTUP_TIMES.items():
+        if times:
+            summary[f'{kind}_count'] = len(times)
+            summary[f'{kind}_mean_s'] = sum(times) / len(times)
+    return summary
+
+
+class DriverFactory:
+    """Patches a version-pinned chromedriver once and shares it across processes."""
+
+    def __init__(self, version_main: int, cache_dir: str):
+        self.version_main = version_main
+        self.cache_dir = os.path.expanduser(cache_dir)
+
+        suffix = '.exe' if sys.platform.startswith('win') else ''
+        self.binary_path = os.path.join(self.cache_dir, f'chromedriver-{version_main}{suffix}')
+        self.marker_path = f'{self.binary_path}.patched'
+        self.lock_path = os.path.join(self.cache_dir, '.lock')
+
+    def _is_ready(self) -> bool:
+        return os.path.exists(self.binary_path) and os.path.exists(self.marker_path)
+
+    def ensure_binary(self) -> Tuple[str, bool]:
+        if self._is_ready():
+            return self.binary_path, False
+
+        with file_lock(self.lock_path):
+            # Another process may have patched it while we waited for the lock
+            if self._is_ready():
+                return self.binary_path, False
+
+            logger.info(f"Patching chromedriver {self.version_main} into {self.cache_dir}")
+            patcher = uc.Patcher(version_main=self.version_main)
+            patcher.auto()
+
+            staging_path = f'{self.binary_path}.tmp'
+            shutil.copy2(patcher.executable_path, staging_path)
+            os.chmod(staging_path, 0o755)
+            os.replace(staging_path, self.binary_path)
+
+            with open(self.marker_path, 'w') as marker:
+                marker.write(str(self.version_main))
+
+        return self.binary_path, True
+
+    def create(self, options) -> Chrome:
+        started = time.perf_counter()
+        binary_path, cold = self.ensure_binary()
+        patched = time.perf_counter()
+
+        driver = uc.Chrome(
+            options=options,
+            driver_executable_path=binary_path,
+            version_main=self.version_main
+        )
+
+        elapsed = time.perf_counter() - started
+        kind = 'cold' if cold else 'warm'
+        STARTUP_TIMES[kind].append(elapsed)
+        logger.info(
+            f"{kind.capitalize()} driver startup took {elapsed:.1f}s "
+            f"({patched - started:.1f}s preparing chromedriver)"
+        )
+        return driver
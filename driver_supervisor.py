@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from selenium.webdriver import Chrome
+from selenium.common.exceptions import WebDriverException
+
+from retry_policy import is_permanent
+
+logger = logging.getLogger(__name__)
+
+
+class CrashSupervisor:
+    """Tells a dead WebDriver session apart from an ordinary failed step, and restarts it within a budget."""
+
+    def __init__(self, max_restarts: int = 5, probe_timeout: float = 10, reset_after: float = 1800):
+        self.max_restarts = max_restarts
+        self.probe_timeout = probe_timeout
+        self.reset_after = reset_after
+        self.restarts = 0
+        # Never resets, so callers can tell whether a restart happened across a block of work
+        self.total_restarts = 0
+        self._last_restart: Optional[float] = None
+
+    async def session_dead(self, driver: Optional[Chrome]) -> bool:
+        if driver is None:
+            return True
+
+        try:
+            # Run in a thread so a wedged Chrome cannot block the event loop past the probe timeout
+            await asyncio.wait_for(asyncio.to_thread(lambda: driver.current_url), self.probe_timeout)
+            return False
+        except asyncio.TimeoutError:
+            logger.warning(f"WebDriver did not answer within {self.probe_timeout}s")
+            return True
+        except WebDriverException as e:
+            if is_permanent(e):
+                logger.warning(f"WebDriver session is gone: {e.msg or e}")
+                return True
+            return False
+        except (ConnectionError, OSError) as e:
+            # The chromedriver process itself has exited
+            logger.warning(f"WebDriver is unreachable: {e}")
+            return True
+
+    async def restart(self, start: Callable[[], Awaitable[bool]]) -> bool:
+        # The budget is for crashes that come close together; a few hours apart should not end a long crawl
+        if self._last_restart is not None and time.monotonic() - self._last_restart > self.reset_after:
+            logger.info(f"No driver restart for {self.reset_after:.0f}s, resetting the restart budget")
+            self.restarts = 0
+
+        if self.restarts >= self.max_restarts:
+            logger.error(f"Driver restart budget of {self.max_restarts} used up, not restarting again")
+            return False
+
+        self.restarts += 1
+        self.total_restarts += 1
+        started = self._last_restart = time.monotonic()
+        if not await start():
+            logger.error(f"Driver restart {self.restarts}/{self.max_restarts} failed")
+            return False
+
+        logger.info(f"Driver restart {self.restarts}/{self.max_restarts} recovered in {time.monotonic() - started:.1f}s")
+        return True
+
+    async def recover(self, driver: Optional[Chrome], start: Callable[[], Awaitable[bool]]) -> bool:
+        """True only when the session had died and a fresh one is now running."""
+        if not await self.session_dead(driver):
+            return False
+        return await self.restart(start)
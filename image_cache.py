@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+import pandas as pd
+
+from config import SCRAPER_CONFIG
+from settings import apply_settings, load_settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+class ImageCache:
+    """Content-addressed image store; the manifest maps each source URL to the blob it last resolved to."""
+
+    def __init__(self, root: str):
+        self.root = os.path.expanduser(root)
+        self.manifest_path = os.path.join(self.root, MANIFEST_NAME)
+        self.entries: Dict[str, Dict] = {}
+        self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write leaves at most one torn line
+                    continue
+                self.entries[entry['url']] = entry
+
+    def blob_path(self, digest: str, extension: str = '') -> str:
+        return os.path.join(self.root, digest[:2], f'{digest}{extension}')
+
+    def has_blob(self, entry: Dict) -> bool:
+        return os.path.exists(os.path.join(self.root, entry['path']))
+
+    def store(self, url: str, body: bytes, content_type: Optional[str], etag: Optional[str], last_modified: Optional[str]) -> Dict:
+        digest = hashlib.sha256(body).hexdigest()
+        extension = mimetypes.guess_extension((content_type or '').split(';')[0].strip()) or ''
+        path = self.blob_path(digest, extension)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            staging_path = f'{path}.part'
+            with open(staging_path, 'wb') as f:
+                f.write(body)
+            os.replace(staging_path, path)
+
+        entry = {
+            'url': url,
+            'sha256': digest,
+            'path': os.path.relpath(path, self.root),
+            'etag': etag,
+            'last_modified': last_modified
+        }
+        self.record(entry)
+        return entry
+
+    def record(self, entry: Dict):
+        self.entries[entry['url']] = entry
+        with open(self.manifest_path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+
+class ImageDownloader:
+    """Fetches images through one pooled aiohttp session, revalidating URLs the cache already knows."""
+
+    def __init__(self, cache: ImageCache, concurrency: int = 16, timeout: float = 30):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.stats = {'downloaded': 0, 'unchanged': 0, 'failed': 0}
+
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        entry = self.cache.entries.get(url)
+        if not entry or not self.cache.has_blob(entry):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str):
+        try:
+            async with session.get(url, headers=self._conditional_headers(url)) as response:
+                if response.status == 304:
+                    self.stats['unchanged'] += 1
+                    return
+                response.raise_for_status()
+                body = await response.read()
+
+            previous = self.cache.entries.get(url)
+            entry = self.cache.store(
+                url, body,
+                response.headers.get('Content-Type'),
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified')
+            )
+            if previous and previous['sha256'] == entry['sha256']:
+                self.stats['unchanged'] += 1
+            else:
+                self.stats['downloaded'] += 1
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.stats['failed'] += 1
+            logger.warning(f"Failed to download {url}: {e}")
+
+    async def download(self, urls: Iterable[str]) -> Dict[str, int]:
+        queue: asyncio.Queue = asyncio.Queue()
+        for url in dict.fromkeys(urls):
+            queue.put_nowait(url)
+        total = queue.qsize()
+
+        async def worker(session: aiohttp.ClientSession):
+            while not queue.empty():
+                await self.fetch(session, queue.get_nowait())
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        headers = {'User-Agent': SCRAPER_CONFIG['user_agent']} if SCRAPER_CONFIG['user_agent'] else None
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=headers) as session:
+            await asyncio.gather(*(worker(session) for _ in range(self.concurrency)))
+
+        logger.info(
+            f"Images: {total} URLs, {self.stats['downloaded']} downloaded, "
+            f"{self.stats['unchanged']} unchanged, {self.stats['failed']} failed"
+        )
+        return self.stats
+
+
+def image_urls(df: pd.DataFrame) -> List[str]:
+    urls = df['Image URL'].dropna()
+    return urls[urls.str.startswith('http')].tolist()
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Download product images into the content-addressed cache")
+    parser.add_argument('--input', help="Product file with an 'Image URL' column (default: the latest snapshot)")
+    args, remaining = parser.parse_known_args(argv)
+
+    settings = load_settings(remaining)
+    apply_settings(settings)
+
+    source = args.input or settings.snapshot_file
+    df = pd.read_excel(source) if source.endswith('.xlsx') else pd.read_csv(source)
+
+    cache = ImageCache(settings.image_cache_dir)
+    await ImageDownloader(cache, settings.image_workers, settings.timeout).download(image_urls(df))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,23 @@
+import logging
+import os
+import sqlite3
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def write_output(df: pd.DataFrame, sink: str, path: str, table: str = 'products'):
+    if sink == 'csv':
+        df.to_csv(path, index=False)
+    elif sink == 'xlsx':
+        path = os.path.splitext(path)[0] + '.xlsx'
+        df.to_excel(path, index=False, engine='xlsxwriter')
+    elif sink == 'sqlite':
+        path = os.path.splitext(path)[0] + '.db'
+        with sqlite3.connect(path) as conn:
+            df.to_sql(table, conn, if_exists='append', index=False)
+    else:
+        raise ValueError(f"Unknown output sink: {sink}")
+
+    logger.info(f"Saved {len(df)} rows to {path}")
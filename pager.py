@@ -0,0 +1,73 @@
+import logging
+import re
+from typing import List, NamedTuple, Optional
+from urllib.parse import urlencode, urljoin
+
+from selenium.webdriver import Chrome
+from selenium.webdriver.common.by import By
+
+from config import SCRAPER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class PageTask(NamedTuple):
+    category: str
+    page: int
+    url: str
+    attempts: int = 0
+
+
+def build_search_url(query: str, page: int = 1, fulfillment: str = "PICKUP") -> str:
+    params = {
+        'query': query,
+        'searchType': 'default_search',
+        'fulfillment': fulfillment
+    }
+    if page > 1:
+        params['page'] = page
+    # Read at call time so --base-url applies after settings are loaded
+    return f"{urljoin(SCRAPER_CONFIG['base_url'], 'search')}?{urlencode(params)}"
+
+
+def build_category_url(path: str, page: int = 1, fulfillment: str = "PICKUP") -> str:
+    params = {'fulfillment': fulfillment}
+    if page > 1:
+        params['page'] = page
+    return f"{urljoin(SCRAPER_CONFIG['base_url'], path)}?{urlencode(params)}"
+
+
+async def resume_category_grid(scraper, category: str, page_loads: int) -> bool:
+    """Brings a fresh session back to where a category's grid was, for any scraper with search_category and visit_website."""
+    if not page_loads:
+        return await scraper.search_category(category)
+
+    # Replaying every Load More click would rebuild the DOM a restart just shed and take time quadratic in the
+    # offset; the pager URL opens only the page the grid had last loaded, and Load More goes on from there
+    page = page_loads + 1
+    if not await scraper.visit_website(build_search_url(category, page)):
+        return False
+
+    logger.info(f"Resumed category {category} at page {page}")
+    return True
+
+
+def page_tasks(category: str, page_count: int, is_path: bool = False) -> List[PageTask]:
+    build = build_category_url if is_path else build_search_url
+    return [PageTask(category, page, build(category, page)) for page in range(1, page_count + 1)]
+
+
+def read_page_count(driver: Chrome) -> Optional[int]:
+    # The pagination bar lists page-number buttons; the largest one is the last page
+    pages = []
+    for button in driver.find_elements(By.CSS_SELECTOR, 'nav.kds-Pagination button, nav.kds-Pagination a'):
+        label = button.get_attribute('aria-label') or button.text
+        match = re.search(r'(\d+)\s*$', label or '')
+        if match:
+            pages.append(int(match.group(1)))
+
+    if not pages:
+        logger.warning("No pagination found on page")
+        return None
+
+    return max(pages)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from product_records import ProductRecords
+
+logger = logging.getLogger(__name__)
+
+LinkHandler = Callable[[str], Awaitable[Optional[Dict]]]
+
+_DONE = object()
+
+
+class LinkPipeline:
+    """Bounded producer/consumer queue between link discovery and detail scraping."""
+
+    def __init__(self, maxsize: int = 200):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.results = ProductRecords()
+        self.produced = 0
+        self.failed = 0
+
+    async def put(self, link: str):
+        # Blocks discovery while detail workers are behind, which keeps memory bounded
+        await self.queue.put(link)
+        self.produced += 1
+
+    async def _worker(self, name: str, handler: LinkHandler):
+        while True:
+            link = await self.queue.get()
+            try:
+                if link is _DONE:
+                    return
+
+                result = await handler(link)
+                if result:
+                    self.results.append(result)
+                else:
+                    self.failed += 1
+
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Detail worker {name} failed on {link}: {e}")
+
+            finally:
+                self.queue.task_done()
+
+    async def run(self, producer: Awaitable, handlers: List[LinkHandler]) -> ProductRecords:
+        workers = [
+            asyncio.create_task(self._worker(str(index), handler))
+            for index, handler in enumerate(handlers)
+        ]
+
+        try:
+            await producer
+        except BaseException:
+            # The caller tears the drivers down once this propagates, so workers must not outlive it
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+        for _ in workers:
+            await self.queue.put(_DONE)
+        await asyncio.gather(*workers)
+        logger.info(
+            f"Pipeline finished: {self.produced} links discovered, "
+            f"{len(self.results)} scraped, {self.failed} failed"
+        )
+        return self.results
@@ -0,0 +1,417 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+
+from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from config import PRODUCT_CATEGORIES, SCRAPER_CONFIG
+from circuit_breaker import shared_circuit_breaker
+from popup_guard import QUALTRICS_GUARD_SCRIPT
+from rate_control import is_throttled_page, shared_rate_controller
+from settings import apply_settings, load_settings
+from store_session import MODALITY_BUTTON_ID, StoreSessionCache
+from stopping_policy import yield_stop_policy
+from output_sink import write_output
+from product_records import ProductRecords
+
+logger = logging.getLogger(__name__)
+
+GRID_CELL_SELECTOR = 'div[data-testid="auto-grid-cell"]'
+LOAD_MORE_SELECTOR = 'button.LoadMore__load-more-button'
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+
+
+def _playwright_cookies(cookies: List[Dict]) -> List[Dict]:
+    # Selenium's get_cookies() format differs slightly from what add_cookies() accepts
+    converted = []
+    for cookie in cookies:
+        entry = {
+            'name': cookie['name'],
+            'value': cookie['value'],
+            'domain': cookie['domain'],
+            'path': cookie.get('path', '/'),
+            'secure': cookie.get('secure', False),
+            'httpOnly': cookie.get('httpOnly', False)
+        }
+        if 'expiry' in cookie:
+            entry['expires'] = cookie['expiry']
+        if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+            entry['sameSite'] = cookie['sameSite']
+        converted.append(entry)
+    return converted
+
+
+class PlaywrightSession:
+    """One isolated browser context with the same operations as the Selenium MarianosScraper."""
+
+    def __init__(self, context: BrowserContext, zip_code: Optional[str], store_id: str, timeout: int = 30):
+        self.context = context
+        self.zip_code = zip_code
+        self.store_id = store_id
+        self.timeout_ms = timeout * 1000
+        self.page: Optional[Page] = None
+        self.unique_product_links: set = set()
+        self.all_product_links: List[str] = []
+        self.rate = shared_rate_controller(SCRAPER_CONFIG)
+        self.breaker = shared_circuit_breaker(SCRAPER_CONFIG)
+
+    async def open(self):
+        await self.context.add_init_script(QUALTRICS_GUARD_SCRIPT)
+        if SCRAPER_CONFIG['block_resources']:
+            await self.context.route(
+                '**/*',
+                lambda route: route.abort() if route.request.resource_type in BLOCKED_RESOURCE_TYPES else route.continue_()
+            )
+        self.page = await self.context.new_page()
+        self.page.set_default_timeout(self.timeout_ms)
+
+    async def visit(self, url: str) -> bool:
+        await self.breaker.before_request()
+        await self.rate.acquire()
+        started = time.monotonic()
+        try:
+            await self.page.goto(url, wait_until='domcontentloaded')
+            if is_throttled_page(await self.page.title()):
+                self.rate.record_error(throttled=True)
+                self.breaker.record_failure()
+                logger.warning(f"Throttled while loading {url}")
+                return False
+        except PlaywrightError as e:
+            logger.warning(f"Error visiting {url}: {e}")
+            self.rate.record_error()
+            self.breaker.record_failure()
+            return False
+
+        self.rate.record_success(time.monotonic() - started)
+        self.breaker.record_success()
+        return True
+
+    async def select_store(self) -> bool:
+        if not self.zip_code:
+            logger.warning("No zip code provided for store selection")
+            return False
+
+        try:
+            await self.page.click('#CurrentModality-button-A11Y-FOCUS-ID')
+            try:
+                await self.page.click('#ModalitySelector--CloseButton', timeout=5000)
+                await self.page.click('#CurrentModality-button-A11Y-FOCUS-ID')
+            except PlaywrightTimeoutError:
+                logger.info("No cancel icon found or could not click it")
+
+            await self.page.click('[data-testid="ModalityOption-Button-PICKUP"]')
+            await self.page.fill('[data-testid="PostalCodeSearchBox-input"]', self.zip_code)
+            await self.page.click('//button[@aria-label="Search"]')
+            await self.page.click(f'[data-testid="SelectStore-{self.store_id}"]')
+            await self.page.wait_for_load_state('networkidle')
+            logger.info(f"Selected store {self.store_id} successfully!")
+            return True
+
+        except PlaywrightError as e:
+            logger.error(f"An error occurred during store selection: {e}")
+            return False
+
+    async def apply_store_session(self) -> bool:
+        # Reuse a session captured by the Selenium scrapers when one is cached
+        cache = StoreSessionCache(
+            SCRAPER_CONFIG['store_session_dir'],
+            SCRAPER_CONFIG['store_session_max_age_hours'],
+            SCRAPER_CONFIG['element_wait']
+        )
+        snapshot = cache.load(self.store_id)
+        if not snapshot or not snapshot.get('modality_label'):
+            return False
+
+        expected = snapshot['modality_label']
+        try:
+            await self.context.add_cookies(_playwright_cookies(snapshot['cookies']))
+            await self.page.evaluate(
+                "items => { for (const [k, v] of Object.entries(items)) localStorage.setItem(k, v); }",
+                snapshot['local_storage']
+            )
+            await self.page.reload()
+
+            # The header renders after the reload, first with a placeholder; give it time to show the store
+            await self.page.wait_for_function(
+                "([id, expected]) => document.getElementById(id)?.textContent.trim() === expected",
+                arg=[MODALITY_BUTTON_ID, expected],
+                timeout=SCRAPER_CONFIG['element_wait'] * 1000
+            )
+        except PlaywrightTimeoutError:
+            logger.info(f"Store session for {self.store_id} did not take effect (expected {expected!r})")
+            return False
+        except PlaywrightError as e:
+            logger.warning(f"Could not apply store session for {self.store_id}: {e}")
+            return False
+
+        logger.info(f"Store {self.store_id} applied directly ({expected})")
+        return True
+
+    async def start(self, base_url: str) -> bool:
+        try:
+            await self.open()
+        except PlaywrightError as e:
+            logger.error(f"Could not open a page in the browser context: {e}")
+            return False
+        if not await self.visit(base_url):
+            return False
+        if self.zip_code:
+            if SCRAPER_CONFIG['fast_store_selection'] and await self.apply_store_session():
+                return True
+            if not await self.select_store():
+                logger.warning("Failed to select store, continuing anyway")
+        return True
+
+    async def search_category(self, category: str) -> bool:
+        try:
+            await self.breaker.before_request()
+            await self.rate.acquire()
+            started = time.monotonic()
+
+            await self.page.click('#SearchBar-input')
+            await self.page.fill('#SearchBar-input-open', category)
+            await self.page.press('#SearchBar-input-open', 'Enter')
+            await self.page.wait_for_selector(GRID_CELL_SELECTOR)
+
+            self.rate.record_success(time.monotonic() - started)
+            self.breaker.record_success()
+            logger.info(f"Searched for category: {category}")
+            return True
+
+        except PlaywrightError as e:
+            logger.error(f"Error searching for category {category}: {e}")
+            self.rate.record_error()
+            self.breaker.record_failure()
+            return False
+
+    async def extract_product_links(self) -> List[str]:
+        try:
+            links = await self.page.eval_on_selector_all(
+                GRID_CELL_SELECTOR,
+                "cells => cells.map(cell => cell.querySelector('a')).filter(Boolean).map(a => a.href)"
+            )
+        except PlaywrightError as e:
+            logger.error(f"Error extracting product links: {e}")
+            return []
+
+        unique_new_links = [link for link in links if link not in self.unique_product_links]
+        self.unique_product_links.update(unique_new_links)
+        self.all_product_links.extend(unique_new_links)
+
+        logger.info(f"Found {len(unique_new_links)} new product links")
+        return unique_new_links
+
+    async def click_load_more(self) -> bool:
+        button = self.page.locator(LOAD_MORE_SELECTOR)
+        try:
+            await button.wait_for(state='visible', timeout=SCRAPER_CONFIG['element_wait'] * 1000)
+        except PlaywrightTimeoutError:
+            logger.info("No more 'Load More' button found")
+            return False
+
+        await self.rate.acquire()
+        started = time.monotonic()
+        try:
+            cells_before = await self.page.locator(GRID_CELL_SELECTOR).count()
+            await button.click()
+            await self.page.wait_for_function(
+                "([selector, count]) => document.querySelectorAll(selector).length > count",
+                arg=[GRID_CELL_SELECTOR, cells_before]
+            )
+            self.rate.record_success(time.monotonic() - started)
+            return True
+
+        except PlaywrightError as e:
+            logger.warning(f"Error clicking 'Load More' button: {e}")
+            self.rate.record_error()
+            return False
+
+    async def scrape_category(self, category: str) -> List[str]:
+        if not await self.search_category(category):
+            return []
+
+        category_links = []
+        page_loads = 0
+        stop_policy = yield_stop_policy(SCRAPER_CONFIG)
+        while page_loads < SCRAPER_CONFIG['max_page_loads_per_category']:
+            new_links = await self.extract_product_links()
+            category_links.extend(new_links)
+
+            stop_policy.record(len(new_links))
+            if stop_policy.should_stop(category):
+                break
+            if not await self.click_load_more():
+                break
+            page_loads += 1
+            logger.info(f"Loaded page {page_loads} for category {category}")
+
+        logger.info(f"Finished scraping category {category}. Found {len(category_links)} links.")
+        return category_links
+
+    async def _text(self, selector: str) -> Optional[str]:
+        element = await self.page.query_selector(selector)
+        return (await element.inner_text()).strip() if element else None
+
+    async def scrape_product_details(self, link: str) -> Optional[Dict]:
+        if not await self.visit(link):
+            return None
+
+        try:
+            await self.page.wait_for_selector('h1[data-testid="product-details-name"]')
+            return await self.read_product_details(link)
+        except PlaywrightTimeoutError:
+            logger.error(f"Product details did not load for {link}")
+            return None
+        except PlaywrightError as e:
+            logger.error(f"Error scraping product details for {link}: {e}")
+            return None
+
+    async def read_product_details(self, link: str) -> Dict:
+        product_name = await self._text('h1[data-testid="product-details-name"]')
+        upc = (await self._text('span[data-testid="product-details-upc"]') or '').replace("UPC: ", "")
+        location = await self._text('span[data-testid="product-details-location"]') or ""
+
+        category = "Uncategorized"
+        for breadcrumb in await self.page.query_selector_all('a.kds-Link.kds-Link--inherit.mr-4'):
+            text = (await breadcrumb.inner_text()).strip()
+            if text != "Home":
+                category = text
+                break
+
+        price_element = await self.page.query_selector('[typeof="Price"]')
+        if price_element:
+            price = f"${await price_element.get_attribute('value')}"
+        else:
+            dollars = await self._text('mark.kds-Price-promotional span.kds-Price-promotional-dropCaps')
+            cents = await self._text('mark.kds-Price-promotional sup.kds-Price-superscript')
+            price = f"${dollars}.{cents.replace('.', '')}" if dollars and cents else "Price Not Available"
+
+        image_element = await self.page.query_selector('.ProductImages-image')
+        image_url = await image_element.get_attribute('src') if image_element else "No image available"
+
+        logger.info(f"Scraped product: {product_name}")
+        return {
+            'UPC': f"#{upc}",
+            'Category': category,
+            'Title': product_name,
+            'Location': location,
+            'Price': price,
+            'Image URL': image_url,
+            'Product Link': link
+        }
+
+    async def close(self):
+        await self.context.close()
+
+
+class PlaywrightBackend:
+    """Runs many isolated browser contexts inside a single Chromium process."""
+
+    def __init__(self, headless: bool = True, user_agent: Optional[str] = None):
+        self.headless = headless
+        self.user_agent = user_agent
+        self._playwright = None
+        self.browser: Optional[Browser] = None
+
+    async def __aenter__(self) -> 'PlaywrightBackend':
+        self._playwright = await async_playwright().start()
+        self.browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=['--disable-blink-features=AutomationControlled', '--disable-dev-shm-usage']
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.browser:
+            await self.browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def new_session(self, zip_code: Optional[str], store_id: str, timeout: int = 30) -> PlaywrightSession:
+        context = await self.browser.new_context(
+            user_agent=self.user_agent,
+            viewport={'width': 1920, 'height': 1080}
+        )
+        return PlaywrightSession(context, zip_code, store_id, timeout)
+
+
+async def scrape_with_contexts(categories: List[str], contexts: int, scrape_details: bool = True) -> ProductRecords:
+    async with PlaywrightBackend(SCRAPER_CONFIG['headless'], SCRAPER_CONFIG['user_agent']) as backend:
+        sessions = [
+            await backend.new_session(SCRAPER_CONFIG['zip_code'], SCRAPER_CONFIG['store_id'], SCRAPER_CONFIG['timeout'])
+            for _ in range(contexts)
+        ]
+        started = await asyncio.gather(*(session.start(SCRAPER_CONFIG['base_url']) for session in sessions))
+        sessions = [session for session, ok in zip(sessions, started) if ok]
+        if not sessions:
+            logger.error("No browser context could start a session")
+            return ProductRecords()
+
+        category_queue: asyncio.Queue = asyncio.Queue()
+        for category in categories:
+            category_queue.put_nowait(category)
+
+        link_queue: asyncio.Queue = asyncio.Queue()
+        results = ProductRecords()
+        seen = set()
+
+        # Contain failures to one category or link so gather does not abort the other contexts
+        async def discover(session: PlaywrightSession):
+            while not category_queue.empty():
+                category = category_queue.get_nowait()
+                try:
+                    category_links = await session.scrape_category(category)
+                except PlaywrightError as e:
+                    logger.error(f"Category {category} failed: {e}")
+                    continue
+                for link in category_links:
+                    if link not in seen:
+                        seen.add(link)
+                        link_queue.put_nowait(link)
+
+        async def detail(session: PlaywrightSession):
+            while not link_queue.empty():
+                link = link_queue.get_nowait()
+                try:
+                    product_detail = await session.scrape_product_details(link)
+                except PlaywrightError as e:
+                    logger.error(f"Error processing link {link}: {e}")
+                    product_detail = None
+                if product_detail:
+                    results.append(product_detail)
+                await asyncio.sleep(random.uniform(0.5, 1.5))
+
+        try:
+            await asyncio.gather(*(discover(session) for session in sessions))
+            if not scrape_details:
+                return ProductRecords({'Product Link': link} for link in seen)
+
+            await asyncio.gather(*(detail(session) for session in sessions))
+            return results
+        finally:
+            for session in sessions:
+                await session.close()
+
+
+async def main(argv: Optional[List[str]] = None):
+    settings = load_settings(argv)
+    apply_settings(settings)
+
+    product_details = await scrape_with_contexts(PRODUCT_CATEGORIES, settings.browser_contexts)
+    if product_details:
+        # output_file holds the link catalog the store sweep reads back, so detail rows go elsewhere
+        write_output(product_details.to_dataframe(), settings.output_sink, settings.details_file, 'product_details')
+    else:
+        logger.warning("No products were scraped")
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    asyncio.run(main())
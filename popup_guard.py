@@ -0,0 +1,78 @@
+import logging
+
+from selenium.webdriver import Chrome
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# Watches for the Qualtrics "We want to hear from you!" dialog and clicks "No, thanks"
+# the moment it is inserted, so the crawl loop never has to wait on it.
+QUALTRICS_GUARD_SCRIPT = """
+(() => {
+    if (window.__qualtricsGuard) {
+        return;
+    }
+    window.__qualtricsGuard = true;
+
+    const PROMPT = 'We want to hear from you!';
+    const DISMISS = 'No, thanks';
+
+    const dismissIn = (root) => {
+        const buttons = root.tagName === 'BUTTON' ? [root] : root.querySelectorAll('button');
+        for (const button of buttons) {
+            if (!button.textContent.includes(DISMISS)) {
+                continue;
+            }
+            for (let el = button.parentElement; el; el = el.parentElement) {
+                if (el.textContent.includes(PROMPT)) {
+                    button.click();
+                    window.__qualtricsDismissed = (window.__qualtricsDismissed || 0) + 1;
+                    return;
+                }
+            }
+        }
+    };
+
+    const observer = new MutationObserver((mutations) => {
+        for (const mutation of mutations) {
+            for (const node of mutation.addedNodes) {
+                if (node.nodeType === Node.ELEMENT_NODE && !node.closest('[data-testid="auto-grid-cell"]')) {
+                    dismissIn(node);
+                }
+            }
+        }
+    });
+
+    const start = () => {
+        observer.observe(document.documentElement, {childList: true, subtree: true});
+        if (document.body) {
+            dismissIn(document.body);
+        }
+    };
+
+    if (document.documentElement) {
+        start();
+    } else {
+        document.addEventListener('DOMContentLoaded', start, {once: true});
+    }
+})();
+"""
+
+
+def install_popup_guard(driver: Chrome) -> bool:
+    # Registered per tab: new documents get it from CDP, the current one from execute_script
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': QUALTRICS_GUARD_SCRIPT})
+        driver.execute_script(QUALTRICS_GUARD_SCRIPT)
+        logger.info("Qualtrics popup guard installed")
+        return True
+    except WebDriverException as e:
+        logger.warning(f"Could not install Qualtrics popup guard: {e}")
+        return False
+
+
+def dismissed_count(driver: Chrome) -> int:
+    try:
+        return driver.execute_script("return window.__qualtricsDismissed || 0;")
+    except WebDriverException:
+        return 0
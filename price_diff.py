@@ -0,0 +1,98 @@
+import argparse
+import logging
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from config import SCRAPER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+REPORT_SECTIONS = ('increases', 'decreases', 'new_promos', 'new_skus', 'delistings')
+
+
+def read_snapshot(path: str) -> Optional[pd.DataFrame]:
+    if not os.path.exists(path):
+        return None
+    if path.endswith('.xlsx'):
+        return pd.read_excel(path, dtype=str)
+    return pd.read_csv(path, dtype=str)
+
+
+def _price_cents(values: pd.Series) -> pd.Series:
+    parts = values.fillna('').str.replace(',', '', regex=False).str.extract(r'(\d+)(?:\.(\d{1,2}))?')
+    cents = parts[1].fillna('0').str.ljust(2, '0')
+    return (pd.to_numeric(parts[0]) * 100 + pd.to_numeric(cents)).astype('Int64')
+
+
+def normalize_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per canonical UPC with integer cents, regardless of which scraper wrote the file."""
+    columns = {}
+    columns['upc'] = pd.to_numeric(df['UPC'].astype(str).str.replace(r'\D', '', regex=True), errors='coerce').astype('Int64')
+    columns['title'] = df.get('Title')
+    columns['category'] = df['Category'] if 'Category' in df else pd.Series('Uncategorized', index=df.index)
+    columns['price_cents'] = _price_cents(df['Price']) if 'Price' in df else pd.Series(pd.NA, index=df.index, dtype='Int64')
+    columns['promo_cents'] = _price_cents(df['Promo Price']) if 'Promo Price' in df else pd.Series(pd.NA, index=df.index, dtype='Int64')
+
+    snapshot = pd.DataFrame(columns, index=df.index).dropna(subset=['upc'])
+    snapshot['category'] = snapshot['category'].fillna('Uncategorized')
+    return snapshot.drop_duplicates('upc', keep='last')
+
+
+def diff_snapshots(previous: pd.DataFrame, current: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    merged = normalize_snapshot(previous).merge(
+        normalize_snapshot(current), on='upc', how='outer', suffixes=('_before', '_after'), indicator=True
+    )
+    merged['category'] = merged['category_after'].fillna(merged['category_before'])
+    merged['title'] = merged['title_after'].fillna(merged['title_before'])
+    merged['change_cents'] = merged['price_cents_after'] - merged['price_cents_before']
+
+    both = merged['_merge'] == 'both'
+    promo_started = merged['promo_cents_after'].notna() & merged['promo_cents_before'].isna()
+
+    columns = ['upc', 'title', 'category', 'price_cents_before', 'price_cents_after', 'change_cents', 'promo_cents_after']
+    return {
+        'increases': merged.loc[both & (merged['change_cents'] > 0), columns],
+        'decreases': merged.loc[both & (merged['change_cents'] < 0), columns],
+        'new_promos': merged.loc[both & promo_started, columns],
+        'new_skus': merged.loc[merged['_merge'] == 'right_only', columns],
+        'delistings': merged.loc[merged['_merge'] == 'left_only', columns]
+    }
+
+
+def category_counts(report: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    counts = pd.concat(
+        {section: rows.groupby('category').size() for section, rows in report.items()}, axis=1
+    )
+    return counts.reindex(columns=list(REPORT_SECTIONS)).fillna(0).astype(int).sort_index()
+
+
+def write_report(report: Dict[str, pd.DataFrame], path: str):
+    with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
+        category_counts(report).to_excel(writer, sheet_name='by_category')
+        for section in REPORT_SECTIONS:
+            report[section].to_excel(writer, sheet_name=section, index=False)
+
+    logger.info(
+        f"Price change report saved to {path}: "
+        + ', '.join(f"{len(report[section])} {section.replace('_', ' ')}" for section in REPORT_SECTIONS)
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare two product snapshots")
+    parser.add_argument('previous')
+    parser.add_argument('current')
+    parser.add_argument('--output', default=SCRAPER_CONFIG['price_report_file'])
+    args = parser.parse_args(argv)
+
+    previous, current = read_snapshot(args.previous), read_snapshot(args.current)
+    if previous is None or current is None:
+        parser.error("both snapshot files must exist")
+
+    write_report(diff_snapshots(previous, current), args.output)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    main()
@@ -0,0 +1,313 @@
+import argparse
+import glob
+import logging
+import os
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import SCRAPER_CONFIG
+from catalog_db import day_key, parse_price_cents, parse_upc
+from locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+RECORD_DTYPE = np.dtype([
+    ('upc', '<i8'),
+    ('store_id', '<i8'),
+    ('observed_at', '<i8'),
+    ('price_cents', '<i4'),
+    ('promo_cents', '<i4')
+])
+
+# Stand-in for a missing price, since the columns are plain integers
+MISSING_CENTS = -1
+
+
+def _day_from_key(key: int) -> date:
+    return date(key // 10000, key // 100 % 100, key % 100)
+
+
+def _sort_records(records: np.ndarray) -> np.ndarray:
+    """Partition order: (store_id, upc, observed_at), so each store is one contiguous run of UPC groups."""
+    return records[np.lexsort((records['observed_at'], records['upc'], records['store_id']))]
+
+
+def _in_order(records: np.ndarray) -> bool:
+    stores, upcs, times = records['store_id'], records['upc'], records['observed_at']
+    same_store = stores[1:] == stores[:-1]
+    same_upc = same_store & (upcs[1:] == upcs[:-1])
+    return bool(np.all(
+        (stores[1:] > stores[:-1]) | (same_store & (upcs[1:] > upcs[:-1])) | (same_upc & (times[1:] >= times[:-1]))
+    ))
+
+
+def _store_runs(records: np.ndarray):
+    """Yields (store_id, rows) for each store's contiguous run in a sorted partition."""
+    stores = records['store_id']
+    bounds = np.flatnonzero(stores[1:] != stores[:-1]) + 1
+    for start, end in zip(np.append(0, bounds), np.append(bounds, len(records))):
+        yield int(stores[start]), records[start:end]
+
+
+def _group_bounds(records: np.ndarray):
+    """First/last index of each UPC group in one store's sorted run."""
+    new_group = np.empty(len(records), dtype=bool)
+    new_group[:1] = True
+    new_group[1:] = records['upc'][1:] != records['upc'][:-1]
+    starts = np.flatnonzero(new_group)
+    ends = np.append(starts[1:], len(records)) - 1
+    return starts, ends
+
+
+def _missing_as_na(df: pd.DataFrame) -> pd.DataFrame:
+    for column in ('price_cents', 'promo_cents'):
+        df[column] = df[column].where(df[column] != MISSING_CENTS).astype('Int32')
+    return df
+
+
+class _GroupFold:
+    """Running per-(store_id, upc) aggregates, folded in one partition at a time so a window never sits in memory."""
+
+    def __init__(self, combine: Callable[[Dict[str, np.ndarray], Any, Dict[str, np.ndarray]], None]):
+        self.combine = combine
+        self.stores: Dict[int, Dict[str, np.ndarray]] = {}
+
+    def holds(self, store_id: int, upcs: np.ndarray) -> bool:
+        state = self.stores.get(store_id)
+        return state is not None and np.array_equal(state['upc'], upcs)
+
+    def add(self, store_id: int, values: Dict[str, np.ndarray]):
+        state = self.stores.get(store_id)
+        if state is None:
+            self.stores[store_id] = values
+            return
+
+        upcs = values['upc']
+        # Daily snapshots mostly list the same products, which skips the lookup entirely
+        if np.array_equal(state['upc'], upcs):
+            self.combine(state, slice(None), values)
+            return
+
+        positions = np.searchsorted(state['upc'], upcs)
+        found = positions < len(state['upc'])
+        found[found] = state['upc'][positions[found]] == upcs[found]
+        self.combine(state, positions[found], {name: column[found] for name, column in values.items()})
+
+        new = ~found
+        if new.any():
+            for name in state:
+                state[name] = np.insert(state[name], positions[new], values[name][new])
+
+    def frame(self, columns: List[str]) -> pd.DataFrame:
+        parts = [
+            pd.DataFrame({'store_id': np.full(len(state['upc']), store_id, dtype=np.int64), **state})
+            for store_id, state in sorted(self.stores.items())
+        ]
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True)[columns]
+
+
+def _combine_changes(state: Dict[str, np.ndarray], index, day: Dict[str, np.ndarray]):
+    # A price that differs from the previous day's last one is a move across the partition boundary
+    state['changes'][index] += day['changes'] + (state['last_cents'][index] != day['first_cents'])
+    state['last_cents'][index] = day['last_cents']
+
+
+def _combine_counts(state: Dict[str, np.ndarray], index, day: Dict[str, np.ndarray]):
+    state['observations'][index] += day['observations']
+    state['promo_observations'][index] += day['promo_observations']
+
+
+class PriceHistory:
+    """Append-only price observations in one fixed-width binary file per day, read back through np.memmap.
+
+    Each partition is kept sorted by (store_id, upc, observed_at), so queries merge partitions in
+    day order instead of sorting a whole window.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.expanduser(root)
+        self._lock_path = os.path.join(self.root, '.lock')
+
+    def _partition_path(self, key: int) -> str:
+        return os.path.join(self.root, f'{key}.bin')
+
+    def partitions(self, start: Optional[int] = None, end: Optional[int] = None) -> List[int]:
+        keys = sorted(int(os.path.basename(path)[:-4]) for path in glob.glob(os.path.join(self.root, '*.bin')))
+        return [key for key in keys if (start is None or key >= start) and (end is None or key <= end)]
+
+    def append(self, rows: Iterable[Dict], store_id, observed_at: Optional[float] = None) -> int:
+        observed_at = int(observed_at or time.time())
+        records = []
+        for row in rows:
+            upc = parse_upc(row.get('UPC'))
+            if upc is None:
+                continue
+            price = parse_price_cents(row.get('Price'))
+            promo = parse_price_cents(row.get('Promo Price'))
+            records.append((
+                upc,
+                int(row.get('Store ID') or store_id),
+                observed_at,
+                MISSING_CENTS if price is None else price,
+                MISSING_CENTS if promo is None else promo
+            ))
+
+        return self.append_records(np.array(records, dtype=RECORD_DTYPE), observed_at)
+
+    def append_records(self, records: np.ndarray, observed_at: int) -> int:
+        if not len(records):
+            return 0
+
+        records = _sort_records(records)
+        key = day_key(date.fromtimestamp(observed_at))
+        path = self._partition_path(key)
+        with file_lock(self._lock_path):
+            count = self._drop_torn_record(path)
+            last = np.fromfile(path, dtype=RECORD_DTYPE, count=1, offset=(count - 1) * RECORD_DTYPE.itemsize) if count else None
+
+            if last is None or _in_order(np.concatenate([last, records[:1]])):
+                with open(path, 'ab') as f:
+                    records.tofile(f)
+            else:
+                # Another store or run already wrote this day; rewrite it merged so it stays sorted
+                merged = _sort_records(np.concatenate([np.fromfile(path, dtype=RECORD_DTYPE, count=count), records]))
+                staging_path = f'{path}.tmp'
+                merged.tofile(staging_path)
+                os.replace(staging_path, path)
+
+        logger.info(f"Appended {len(records)} price observations to partition {key}")
+        return len(records)
+
+    def _drop_torn_record(self, path: str) -> int:
+        # A writer killed mid-append leaves a partial record; appending after it would misalign every later one
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+        torn = size % RECORD_DTYPE.itemsize
+        if torn:
+            logger.warning(f"Dropping a torn {torn}-byte record at the end of {path}")
+            os.truncate(path, size - torn)
+        return size // RECORD_DTYPE.itemsize
+
+    def load_partition(self, key: int) -> np.ndarray:
+        path = self._partition_path(key)
+        count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+
+    def load(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        with file_lock(self._lock_path, shared=True):
+            parts = [self.load_partition(key) for key in self.partitions(start, end)]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+
+    def latest_prices(self, as_of: Optional[int] = None) -> pd.DataFrame:
+        """Most recent observation per (upc, store_id), reading partitions newest first."""
+        # Newer partitions are folded in first, so an existing entry is never replaced
+        fold = _GroupFold(lambda state, index, day: None)
+        with file_lock(self._lock_path, shared=True):
+            for key in reversed(self.partitions(end=as_of)):
+                for store_id, records in _store_runs(self.load_partition(key)):
+                    _, ends = _group_bounds(records)
+                    upcs = records['upc'][ends]
+                    if fold.holds(store_id, upcs):
+                        continue
+                    # Columns are gathered one at a time; fancy-indexing whole structured rows is far slower
+                    fold.add(store_id, {
+                        name: upcs if name == 'upc' else records[name][ends]
+                        for name in RECORD_DTYPE.names if name != 'store_id'
+                    })
+
+        return _missing_as_na(fold.frame(list(RECORD_DTYPE.names)))
+
+    def price_changes(self, start: int, end: int) -> pd.DataFrame:
+        """Per (upc, store_id): first and last price in the window and how many times the price moved."""
+        fold = _GroupFold(_combine_changes)
+        with file_lock(self._lock_path, shared=True):
+            for key in self.partitions(start, end):
+                for store_id, records in _store_runs(self.load_partition(key)):
+                    priced = records['price_cents'] != MISSING_CENTS
+                    if not priced.all():
+                        records = records[priced]
+                    if not len(records):
+                        continue
+
+                    starts, ends = _group_bounds(records)
+                    prices = records['price_cents']
+                    if len(starts) == len(records):
+                        # One snapshot that day, so prices can only move between days
+                        changes = np.zeros(len(starts), dtype=np.int64)
+                    else:
+                        moved = np.zeros(len(records), dtype=np.int64)
+                        moved[1:] = prices[1:] != prices[:-1]
+                        # The first row of each group compares against another product, so it never counts
+                        moved[starts] = 0
+                        changes = np.add.reduceat(moved, starts)
+                    fold.add(store_id, {
+                        'upc': records['upc'][starts],
+                        'first_cents': prices[starts],
+                        'last_cents': prices[ends],
+                        'changes': changes
+                    })
+
+        df = fold.frame(['upc', 'store_id', 'first_cents', 'last_cents', 'changes'])
+        df['change_cents'] = df['last_cents'] - df['first_cents']
+        return df[df['changes'] > 0].reset_index(drop=True)
+
+    def promo_frequency(self, start: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """Share of observations per UPC that carried a promotional price."""
+        fold = _GroupFold(_combine_counts)
+        with file_lock(self._lock_path, shared=True):
+            for key in self.partitions(start, end):
+                for store_id, records in _store_runs(self.load_partition(key)):
+                    starts, ends = _group_bounds(records)
+                    promos = (records['promo_cents'] != MISSING_CENTS).astype(np.int64)
+                    fold.add(store_id, {
+                        'upc': records['upc'][starts],
+                        'observations': ends - starts + 1,
+                        'promo_observations': promos if len(starts) == len(records) else np.add.reduceat(promos, starts)
+                    })
+
+        per_store = fold.frame(['upc', 'observations', 'promo_observations'])
+        df = per_store.groupby('upc', as_index=False, sort=True)[['observations', 'promo_observations']].sum()
+        df['promo_frequency'] = df['promo_observations'] / df['observations']
+        return df.sort_values('promo_frequency', ascending=False, ignore_index=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Query the price history store")
+    parser.add_argument('query', choices=('latest', 'changes', 'promos'))
+    parser.add_argument('--root', default=SCRAPER_CONFIG['price_history_dir'])
+    parser.add_argument('--days', type=int, default=30, help="Window size for changes and promos")
+    parser.add_argument('--output', help="CSV file to write instead of printing")
+    args = parser.parse_args(argv)
+
+    history = PriceHistory(args.root)
+    end = day_key()
+    start = day_key(_day_from_key(end) - timedelta(days=args.days))
+
+    started = time.perf_counter()
+    if args.query == 'latest':
+        df = history.latest_prices()
+    elif args.query == 'changes':
+        df = history.price_changes(start, end)
+    else:
+        df = history.promo_frequency(start, end)
+    logger.info(f"{args.query} query returned {len(df)} rows in {time.perf_counter() - started:.3f}s")
+
+    if args.output:
+        df.to_csv(args.output, index=False)
+    else:
+        print(df.to_string(index=False, max_rows=50))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    main()
@@ -0,0 +1,60 @@
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+# Columns whose values repeat across most rows; one shared string per distinct value
+INTERNED_FIELDS = frozenset({'Category', 'Location', 'Price', 'Promo Price', 'Store ID'})
+
+
+class ProductRecords:
+    """Column-oriented buffer of scraped product details, used in place of a list of dicts."""
+
+    __slots__ = ('_columns', '_length')
+
+    def __init__(self, records: Optional[Iterable[Dict]] = None):
+        self._columns: Dict[str, List] = {}
+        self._length = 0
+        if records:
+            self.extend(records)
+
+    def append(self, record: Dict):
+        for name, value in record.items():
+            column = self._columns.get(name)
+            if column is None:
+                # A field first seen on a later row is padded for the rows before it
+                column = self._columns[name] = [None] * self._length
+            if name in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            column.append(value)
+
+        self._length += 1
+        for column in self._columns.values():
+            if len(column) < self._length:
+                column.append(None)
+
+    def extend(self, records: Iterable[Dict]):
+        for record in records:
+            self.append(record)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str) -> List:
+        return self._columns[name]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> Dict:
+        return {name: column[index] for name, column in self._columns.items()}
+
+    def __iter__(self) -> Iterator[Dict]:
+        # Rows are materialised one at a time for callers that still expect dicts
+        for index in range(self._length):
+            yield self[index]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        # Built column by column, so no per-row dicts are created on the way
+        return pd.DataFrame({name: column for name, column in self._columns.items()}, columns=self.columns)
@@ -0,0 +1,24 @@
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from config import SCRAPER_CONFIG
+
+PRODUCT_PATH_MARKER = '/p/'
+
+
+def canonical_product_url(url: str) -> str:
+    # Product pages are reachable with tracking parameters and trailing slashes; the index keeps one form
+    parts = urlsplit(url.strip())
+    return urlunsplit(('https', parts.netloc.lower(), parts.path.rstrip('/'), '', ''))
+
+
+def product_key(url: str) -> str:
+    # The slug in /p/<slug>/<upc> is derived from the title and differs between sources; the UPC does not
+    path = urlsplit(url.strip()).path.rstrip('/')
+    if PRODUCT_PATH_MARKER in path:
+        return path.rsplit('/', 1)[-1]
+    return canonical_product_url(url)
+
+
+def product_url(slug: str, upc: str) -> str:
+    # Read at call time so --base-url applies after settings are loaded
+    return canonical_product_url(urljoin(SCRAPER_CONFIG['base_url'], f'p/{slug}/{upc}'))
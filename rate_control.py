@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_MARKERS = ('access denied', 'too many requests', 'service unavailable', 'rate limit')
+
+
+class ThrottledError(Exception):
+    pass
+
+
+def is_throttled_page(title: Optional[str]) -> bool:
+    title = (title or '').lower()
+    return any(marker in title for marker in THROTTLE_MARKERS)
+
+
+class AdaptiveRateController:
+    """Token bucket whose rate grows while the site is fast and backs off on slow pages or errors."""
+
+    def __init__(
+        self,
+        max_rate: float = 1.0,
+        min_rate: float = 0.05,
+        initial_rate: float = 0.2,
+        target_latency: float = 4.0,
+        burst: float = 2.0,
+        increase_step: float = 0.02,
+        slow_factor: float = 0.8,
+        error_factor: float = 0.5,
+        throttle_factor: float = 0.25
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = min(initial_rate, max_rate)
+        self.target_latency = target_latency
+        self.burst = burst
+        self.increase_step = increase_step
+        self.slow_factor = slow_factor
+        self.error_factor = error_factor
+        self.throttle_factor = throttle_factor
+
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # Serialized so concurrent workers queue up instead of all waking on the same token
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def _set_rate(self, rate: float, reason: str):
+        rate = max(self.min_rate, min(self.max_rate, rate))
+        if abs(rate - self.rate) >= 0.01:
+            logger.info(f"Request rate {self.rate:.2f}/s -> {rate:.2f}/s ({reason})")
+        self._refill()
+        self.rate = rate
+
+    def record_success(self, latency: float):
+        if latency > self.target_latency:
+            self._set_rate(self.rate * self.slow_factor, f"slow page, {latency:.1f}s")
+        else:
+            self._set_rate(self.rate + self.increase_step, "healthy")
+
+    def record_error(self, throttled: bool = False):
+        if throttled:
+            self._set_rate(self.rate * self.throttle_factor, "throttled")
+            # Drain the bucket so nobody fires a burst straight into a throttle
+            self.tokens = min(self.tokens, 0)
+        else:
+            self._set_rate(self.rate * self.error_factor, "error")
+
+
+_shared_controller: Optional[AdaptiveRateController] = None
+
+
+def shared_rate_controller(config: dict) -> AdaptiveRateController:
+    global _shared_controller
+    if _shared_controller is None:
+        _shared_controller = AdaptiveRateController(
+            max_rate=config['rate_ceiling'],
+            min_rate=config['rate_floor'],
+            initial_rate=config['rate_initial'],
+            target_latency=config['rate_target_latency'],
+            burst=config['rate_burst']
+        )
+    return _shared_controller
@@ -0,0 +1,112 @@
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple, Type
+
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    InvalidSessionIdException,
+    NoSuchElementException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException
+)
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    before_sleep_log,
+    stop_after_attempt,
+    wait_random_exponential
+)
+
+from rate_control import ThrottledError
+
+logger = logging.getLogger(__name__)
+
+# Messages Chrome gives for a session that no retry will bring back
+PERMANENT_MARKERS = (
+    'invalid session id',
+    'chrome not reachable',
+    'session deleted',
+    'no such window',
+    'disconnected: not connected to devtools',
+    'cannot find chrome binary'
+)
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int
+    base_wait: float
+    max_wait: float
+    retry_on: Tuple[Type[BaseException], ...]
+
+
+POLICIES: Dict[str, RetryPolicy] = {
+    'page_load': RetryPolicy(3, 2, 20, (TimeoutException, ThrottledError, WebDriverException)),
+    'load_more': RetryPolicy(3, 5, 40, (ElementClickInterceptedException, StaleElementReferenceException)),
+    'grid_links': RetryPolicy(3, 2, 10, (TimeoutException, StaleElementReferenceException, NoSuchElementException)),
+    'driver_setup': RetryPolicy(3, 3, 15, (WebDriverException, OSError))
+}
+
+
+class RetryBudget:
+    """Caps retries across all operations so a struggling site is not hit with a retry storm."""
+
+    def __init__(self, max_retries: int = 30, window_seconds: float = 60):
+        self.max_retries = max_retries
+        self.window_seconds = window_seconds
+        self._spent: Deque[float] = deque()
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        while self._spent and now - self._spent[0] > self.window_seconds:
+            self._spent.popleft()
+
+        if len(self._spent) >= self.max_retries:
+            logger.warning("Global retry budget exhausted, failing fast")
+            return False
+
+        self._spent.append(now)
+        return True
+
+
+_budget: Optional[RetryBudget] = None
+
+
+def configure_budget(max_retries: int, window_seconds: float = 60):
+    global _budget
+    _budget = RetryBudget(max_retries, window_seconds)
+
+
+def is_permanent(error: BaseException) -> bool:
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in PERMANENT_MARKERS)
+
+
+def should_retry(policy: RetryPolicy, error: BaseException, attempt_number: int, max_attempts: int) -> bool:
+    if is_permanent(error) or not isinstance(error, policy.retry_on):
+        return False
+    # tenacity asks before it checks stop, so the last attempt would otherwise pay for a retry that never comes
+    if attempt_number >= max_attempts:
+        return False
+    return _budget is None or _budget.try_spend()
+
+
+def retrying(operation: str, max_attempts: Optional[int] = None) -> AsyncRetrying:
+    policy = POLICIES[operation]
+    max_attempts = max_attempts or policy.max_attempts
+
+    def retry(retry_state: RetryCallState) -> bool:
+        error = retry_state.outcome.exception()
+        return error is not None and should_retry(policy, error, retry_state.attempt_number, max_attempts)
+
+    return AsyncRetrying(
+        stop=stop_after_attempt(max_attempts),
+        wait=wait_random_exponential(multiplier=policy.base_wait, max=policy.max_wait),
+        retry=retry,
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+        reraise=True
+    )
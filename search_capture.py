@@ -0,0 +1,213 @@
+import base64
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from selenium.webdriver import Chrome
+from selenium.common.exceptions import WebDriverException
+
+from config import SCRAPER_CONFIG
+from product_urls import canonical_product_url, product_url
+
+logger = logging.getLogger(__name__)
+
+# Arrays that hold the grid's products in search responses; recommendation and breadcrumb objects sit
+# elsewhere in the payload and also carry ids and names, so nothing outside these is read as a product
+PRODUCT_ARRAY_KEYS = ('products', 'productList', 'searchProducts')
+
+# Endpoints the search grid is filled from
+RESPONSE_URL_PATTERNS = (
+    '/atlas/v1/product',
+    '/atlas/v1/search',
+    '/search/api',
+    '/products/api'
+)
+
+
+def _slugify(text: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def _parse_amount(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r'\d+(?:\.\d+)?', value.replace(',', ''))
+        if match:
+            return float(match.group())
+    return None
+
+
+def _first(mapping: Dict, *keys: str) -> Any:
+    for key in keys:
+        value = mapping.get(key)
+        if value not in (None, '', [], {}):
+            return value
+    return None
+
+
+def _extract_prices(product: Dict) -> Tuple[Optional[float], Optional[float]]:
+    price = product.get('price') or product.get('prices') or {}
+    if isinstance(price, list):
+        price = price[0] if price else {}
+    if not isinstance(price, dict):
+        return _parse_amount(price), None
+
+    store_prices = price.get('storePrices') or price
+    regular = store_prices.get('regular') or store_prices.get('regularPrice')
+    promo = store_prices.get('promo') or store_prices.get('promoPrice')
+
+    if isinstance(regular, dict):
+        regular = _first(regular, 'price', 'amount', 'value')
+    if isinstance(promo, dict):
+        promo = _first(promo, 'price', 'amount', 'value')
+
+    return _parse_amount(regular), _parse_amount(promo)
+
+
+def _extract_image(item: Dict) -> Optional[str]:
+    images = item.get('images')
+    if isinstance(images, list):
+        # Some responses list bare URLs; others describe each shot, and the front one is preferred
+        # as .ProductImages-image does on the detail page
+        ordered = sorted(images, key=lambda image: not isinstance(image, dict) or image.get('perspective') != 'front')
+        for image in ordered:
+            if isinstance(image, str):
+                url = image
+            elif isinstance(image, dict):
+                url = image.get('url')
+                sizes = image.get('sizes')
+                if not url and isinstance(sizes, list) and sizes and isinstance(sizes[0], dict):
+                    url = sizes[0].get('url')
+            else:
+                continue
+            if url:
+                return url
+    return _first(item, 'imageUrl', 'image', 'thumbnail')
+
+
+def _to_record(product: Dict) -> Optional[Dict]:
+    item = product.get('item') if isinstance(product.get('item'), dict) else product
+
+    upc = _first(item, 'upc', 'gtin13', 'productId') or _first(product, 'upc', 'gtin13', 'productId')
+    title = _first(item, 'description', 'title', 'name')
+    if not upc or not title or not isinstance(title, str):
+        return None
+
+    regular, promo = _extract_prices(product)
+    if regular is None and promo is None:
+        regular, promo = _extract_prices(item)
+
+    link = _first(product, 'productUrl', 'url') or _first(item, 'productUrl', 'url')
+    if isinstance(link, str):
+        link = canonical_product_url(urljoin(SCRAPER_CONFIG['base_url'], link))
+    else:
+        link = product_url(_slugify(title), upc)
+
+    return {
+        'UPC': f"#{upc}",
+        'Title': title,
+        'Price': f"${regular:.2f}" if regular is not None else "Price Not Available",
+        'Promo Price': f"${promo:.2f}" if promo is not None else "",
+        'Image URL': _extract_image(item) or "No image available",
+        'Product Link': link
+    }
+
+
+def _walk(payload: Any) -> Iterator[Dict]:
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            if key in PRODUCT_ARRAY_KEYS and isinstance(value, list):
+                yield from (entry for entry in value if isinstance(entry, dict))
+            else:
+                yield from _walk(value)
+    elif isinstance(payload, list):
+        for value in payload:
+            yield from _walk(value)
+
+
+def parse_products(payload: Any) -> List[Dict]:
+    records = {}
+    for candidate in _walk(payload):
+        record = _to_record(candidate)
+        if record and record['UPC'] not in records:
+            records[record['UPC']] = record
+    return list(records.values())
+
+
+class SearchResponseCapture:
+    """Collects product records from the search grid's XHR/fetch responses via the performance log."""
+
+    def __init__(self, url_patterns: Tuple[str, ...] = RESPONSE_URL_PATTERNS):
+        self.url_patterns = url_patterns
+        self.records: Dict[str, Dict] = {}
+        self._pending: Dict[str, str] = {}
+
+    @staticmethod
+    def configure_options(options):
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    def enable(self, driver: Chrome):
+        driver.execute_cdp_cmd('Network.enable', {})
+        self._pending.clear()
+
+    def _matches(self, url: str) -> bool:
+        return any(pattern in url for pattern in self.url_patterns)
+
+    def _read_body(self, driver: Chrome, request_id: str) -> Optional[Any]:
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except WebDriverException as e:
+            # Chrome evicts bodies of finished requests when its buffer fills up
+            logger.debug(f"Response body for {request_id} no longer available: {e}")
+            return None
+
+        text = body.get('body', '')
+        if body.get('base64Encoded'):
+            text = base64.b64decode(text).decode('utf-8', errors='replace')
+
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    def drain(self, driver: Chrome) -> List[Dict]:
+        try:
+            entries = driver.get_log('performance')
+        except WebDriverException as e:
+            logger.warning(f"Could not read performance log: {e}")
+            return []
+
+        new_records = []
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                if 'json' in response.get('mimeType', '') and self._matches(response.get('url', '')):
+                    self._pending[params['requestId']] = response['url']
+
+            elif method == 'Network.loadingFinished' and params.get('requestId') in self._pending:
+                url = self._pending.pop(params['requestId'])
+                payload = self._read_body(driver, params['requestId'])
+                if payload is None:
+                    continue
+
+                for record in parse_products(payload):
+                    if record['UPC'] not in self.records:
+                        self.records[record['UPC']] = record
+                        new_records.append(record)
+
+                logger.info(f"Captured products from {url}")
+
+        if new_records:
+            logger.info(f"Captured {len(new_records)} new products from search responses")
+        return new_records
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import os
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from locks import file_lock
+
+logger = logging.getLogger(__name__)
+
+KEY_DTYPE = np.dtype('<u8')
+
+
+def link_key(link: str) -> int:
+    """Product code from the last path segment of a /p/ link, or a 64-bit hash when it is not numeric."""
+    segment = urlsplit(link).path.rstrip('/').rsplit('/', 1)[-1]
+    if re.fullmatch(r'\d{1,19}', segment):
+        return int(segment)
+    return int.from_bytes(hashlib.blake2b(link.encode(), digest_size=8).digest(), 'little')
+
+
+class SeenLinkSet:
+    """On-disk set of product codes shared by worker processes and across runs.
+
+    Membership is a binary search over a memory-mapped sorted array plus a hash lookup in the
+    append log written since the last compaction. Writers hold an exclusive file lock; readers
+    take a shared one only while catching up with the log.
+    """
+
+    def __init__(self, root: str, compact_threshold: int = 100000):
+        self.root = os.path.expanduser(root)
+        self.sorted_path = os.path.join(self.root, 'seen.sorted')
+        self.log_path = os.path.join(self.root, 'seen.log')
+        self.lock_path = os.path.join(self.root, '.lock')
+        self.compact_threshold = compact_threshold
+
+        self._sorted = np.empty(0, dtype=KEY_DTYPE)
+        self._sorted_identity: Optional[Tuple[int, int, int]] = None
+        self._log: Set[int] = set()
+        self._log_offset = 0
+
+        with file_lock(self.lock_path, shared=True):
+            self._refresh()
+
+    def _refresh(self):
+        # Compaction replaces the sorted file and truncates the log, so both are re-read from scratch
+        try:
+            stat = os.stat(self.sorted_path)
+            identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            identity = None
+
+        if identity != self._sorted_identity:
+            count = identity[1] // KEY_DTYPE.itemsize if identity else 0
+            self._sorted = (
+                np.memmap(self.sorted_path, dtype=KEY_DTYPE, mode='r', shape=(count,))
+                if count else np.empty(0, dtype=KEY_DTYPE)
+            )
+            self._sorted_identity = identity
+            self._log.clear()
+            self._log_offset = 0
+
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            log_size = 0
+        if log_size < self._log_offset:
+            self._log.clear()
+            self._log_offset = 0
+
+        complete = log_size - log_size % KEY_DTYPE.itemsize
+        if complete > self._log_offset:
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._log_offset)
+                self._log.update(np.frombuffer(f.read(complete - self._log_offset), dtype=KEY_DTYPE).tolist())
+            self._log_offset = complete
+
+    def _in_sorted(self, keys: np.ndarray) -> np.ndarray:
+        if not len(self._sorted):
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.searchsorted(self._sorted, keys)
+        positions[positions == len(self._sorted)] = 0
+        return self._sorted[positions] == keys
+
+    def _unseen(self, keys: List[int]) -> List[bool]:
+        in_sorted = self._in_sorted(np.array(keys, dtype=KEY_DTYPE))
+        return [not found and key not in self._log for key, found in zip(keys, in_sorted)]
+
+    def __contains__(self, link: str) -> bool:
+        with file_lock(self.lock_path, shared=True):
+            self._refresh()
+        return not self._unseen([link_key(link)])[0]
+
+    def unseen(self, links: Iterable[str]) -> List[str]:
+        """Filters out links any process has recorded, without recording the rest."""
+        links = list(dict.fromkeys(links))
+        if not links:
+            return []
+
+        with file_lock(self.lock_path, shared=True):
+            self._refresh()
+        return [link for link, unseen in zip(links, self._unseen([link_key(link) for link in links])) if unseen]
+
+    def add_new(self, links: Iterable[str]) -> List[str]:
+        """Records links and returns only those no process had recorded before."""
+        links = list(dict.fromkeys(links))
+        if not links:
+            return []
+
+        keys = [link_key(link) for link in links]
+        with file_lock(self.lock_path):
+            self._refresh()
+            new = [(link, key) for link, key, unseen in zip(links, keys, self._unseen(keys)) if unseen]
+            if new:
+                with open(self.log_path, 'ab') as f:
+                    np.array([key for _, key in new], dtype=KEY_DTYPE).tofile(f)
+                self._refresh()
+
+            if len(self._log) >= self.compact_threshold:
+                self._compact()
+
+        return [link for link, _ in new]
+
+    def _compact(self):
+        merged = np.union1d(np.asarray(self._sorted), np.fromiter(self._log, dtype=KEY_DTYPE, count=len(self._log)))
+        staging_path = f'{self.sorted_path}.tmp'
+        merged.astype(KEY_DTYPE).tofile(staging_path)
+        os.replace(staging_path, self.sorted_path)
+        open(self.log_path, 'wb').close()
+        self._refresh()
+        logger.info(f"Compacted seen-link set to {len(merged)} product codes")
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._log)
@@ -0,0 +1,196 @@
+import argparse
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field, fields
+from typing import List, Optional, Tuple
+
+from config import SCRAPER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+ENV_PREFIX = 'MARIANO_'
+DEFAULT_CONFIG_FILE = 'config.json'
+
+OUTPUT_SINKS = ('csv', 'xlsx', 'sqlite')
+PAGINATION_MODES = ('load_more', 'direct')
+DISCOVERY_MODES = ('search', 'sitemap', 'departments')
+
+
+def _default(key: str):
+    value = SCRAPER_CONFIG[key]
+    return field(default_factory=lambda: value) if isinstance(value, (list, dict)) else field(default=value)
+
+
+@dataclass
+class Settings:
+    """Typed view of SCRAPER_CONFIG; the dict in config.py holds the defaults."""
+
+    # Site and session
+    base_url: str = _default('base_url')
+    user_agent: Optional[str] = _default('user_agent')
+    zip_code: str = _default('zip_code')
+    store_id: str = _default('store_id')
+    headless: bool = _default('headless')
+    log_level: str = _default('log_level')
+
+    # Concurrency
+    page_workers: int = _default('page_workers')
+    store_workers: int = _default('store_workers')
+    detail_workers: int = _default('detail_workers')
+    link_queue_size: int = _default('link_queue_size')
+    browser_contexts: int = _default('browser_contexts')
+    image_workers: int = _default('image_workers')
+    sitemap_concurrency: int = _default('sitemap_concurrency')
+
+    # Rate control and failure handling
+    rate_ceiling: float = _default('rate_ceiling')
+    rate_floor: float = _default('rate_floor')
+    rate_initial: float = _default('rate_initial')
+    rate_target_latency: float = _default('rate_target_latency')
+    rate_burst: float = _default('rate_burst')
+    breaker_window_seconds: float = _default('breaker_window_seconds')
+    breaker_error_threshold: float = _default('breaker_error_threshold')
+    breaker_min_calls: int = _default('breaker_min_calls')
+    breaker_open_seconds: float = _default('breaker_open_seconds')
+    breaker_max_open_seconds: float = _default('breaker_max_open_seconds')
+    retry_budget_per_minute: int = _default('retry_budget_per_minute')
+
+    # Wait budgets
+    timeout: int = _default('timeout')
+    page_load_timeout: int = _default('page_load_timeout')
+    element_wait: int = _default('element_wait')
+
+    # Crawl behaviour
+    max_page_loads_per_category: int = _default('max_page_loads_per_category')
+    pagination_mode: str = _default('pagination_mode')
+    discovery_mode: str = _default('discovery_mode')
+    department_max_depth: int = _default('department_max_depth')
+    yield_window: int = _default('yield_window')
+    min_yield_per_click: float = _default('min_yield_per_click')
+    yield_grace_clicks: int = _default('yield_grace_clicks')
+    category_time_budget_seconds: float = _default('category_time_budget_seconds')
+    page_max_attempts: int = _default('page_max_attempts')
+    block_resources: bool = _default('block_resources')
+    prune_harvested_cells: bool = _default('prune_harvested_cells')
+    prune_keep_recent: int = _default('prune_keep_recent')
+    capture_search_responses: bool = _default('capture_search_responses')
+    fast_store_selection: bool = _default('fast_store_selection')
+    seen_set_dir: Optional[str] = _default('seen_set_dir')
+    work_queue_url: Optional[str] = _default('work_queue_url')
+    work_queue_run: Optional[str] = _default('work_queue_run')
+    lease_seconds: float = _default('lease_seconds')
+    pipelined_details: bool = _default('pipelined_details')
+    heap_limit_mb: float = _default('heap_limit_mb')
+    dom_node_limit: int = _default('dom_node_limit')
+    health_check_interval: int = _default('health_check_interval')
+    max_driver_restarts: int = _default('max_driver_restarts')
+    driver_restart_reset_seconds: float = _default('driver_restart_reset_seconds')
+
+    # Browser setup
+    chrome_version_main: int = _default('chrome_version_main')
+    driver_cache_dir: str = _default('driver_cache_dir')
+    store_session_dir: str = _default('store_session_dir')
+    store_session_max_age_hours: float = _default('store_session_max_age_hours')
+
+    # Output
+    output_sink: str = _default('output_sink')
+    output_file: str = _default('output_file')
+    details_file: str = _default('details_file')
+    catalog_file: str = _default('catalog_file')
+    catalog_db: str = _default('catalog_db')
+    price_history_dir: str = _default('price_history_dir')
+    snapshot_file: str = _default('snapshot_file')
+    price_report_file: str = _default('price_report_file')
+    image_cache_dir: str = _default('image_cache_dir')
+    store_prices_file: str = _default('store_prices_file')
+
+    def validate(self):
+        if self.output_sink not in OUTPUT_SINKS:
+            raise ValueError(f"output_sink must be one of {OUTPUT_SINKS}, got {self.output_sink!r}")
+        if self.pagination_mode not in PAGINATION_MODES:
+            raise ValueError(f"pagination_mode must be one of {PAGINATION_MODES}, got {self.pagination_mode!r}")
+        if self.discovery_mode not in DISCOVERY_MODES:
+            raise ValueError(f"discovery_mode must be one of {DISCOVERY_MODES}, got {self.discovery_mode!r}")
+        if not 0 < self.rate_floor <= self.rate_ceiling:
+            raise ValueError("rate_floor must be positive and no larger than rate_ceiling")
+        for name in ('page_workers', 'store_workers', 'detail_workers', 'link_queue_size',
+                     'browser_contexts', 'image_workers', 'sitemap_concurrency', 'timeout', 'element_wait'):
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name} must be at least 1")
+
+
+def _coerce(value, field_type, name: str):
+    if field_type is bool:
+        if isinstance(value, bool):
+            return value
+        if str(value).strip().lower() in ('1', 'true', 'yes', 'on'):
+            return True
+        if str(value).strip().lower() in ('0', 'false', 'no', 'off'):
+            return False
+        raise ValueError(f"{name} expects a boolean, got {value!r}")
+
+    if field_type == Tuple[float, float]:
+        parts = value if isinstance(value, (list, tuple)) else str(value).split(',')
+        if len(parts) != 2:
+            raise ValueError(f"{name} expects two comma-separated numbers, got {value!r}")
+        return (float(parts[0]), float(parts[1]))
+
+    if field_type == Optional[str]:
+        return None if value in (None, '') else str(value)
+
+    return field_type(value)
+
+
+def _read_file(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mariano's scraper settings")
+    parser.add_argument('--config', help=f"JSON settings file (default: {DEFAULT_CONFIG_FILE})")
+    for f in fields(Settings):
+        flag = f"--{f.name.replace('_', '-')}"
+        if f.type is bool:
+            parser.add_argument(flag, dest=f.name, action=argparse.BooleanOptionalAction, default=None)
+        else:
+            parser.add_argument(flag, dest=f.name, default=None)
+    return parser
+
+
+def load_settings(argv: Optional[List[str]] = None) -> Settings:
+    """Defaults from config.py, then the JSON file, then MARIANO_* environment variables, then CLI flags."""
+    args = _build_parser().parse_args(argv)
+    config_file = args.config or os.environ.get(f'{ENV_PREFIX}CONFIG', DEFAULT_CONFIG_FILE)
+
+    values = {}
+    known = {f.name: f.type for f in fields(Settings)}
+
+    for key, value in _read_file(config_file).items():
+        if key in known:
+            values[key] = _coerce(value, known[key], key)
+        else:
+            logger.warning(f"Ignoring unknown setting {key!r} in {config_file}")
+
+    for name, field_type in known.items():
+        env_value = os.environ.get(f'{ENV_PREFIX}{name.upper()}')
+        if env_value is not None:
+            values[name] = _coerce(env_value, field_type, name)
+
+    for name, field_type in known.items():
+        cli_value = getattr(args, name)
+        if cli_value is not None:
+            values[name] = _coerce(cli_value, field_type, name)
+
+    settings = Settings(**values)
+    settings.validate()
+    return settings
+
+
+def apply_settings(settings: Settings):
+    # Modules read SCRAPER_CONFIG directly, so the resolved settings are written back into it
+    SCRAPER_CONFIG.update(asdict(settings))
+    logging.getLogger().setLevel(settings.log_level.upper())
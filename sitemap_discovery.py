@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import logging
+import os
+import zlib
+from typing import List, Optional, Set
+from urllib.parse import urljoin, urlsplit
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+import aiohttp
+import pandas as pd
+
+from config import SCRAPER_CONFIG
+from product_urls import PRODUCT_PATH_MARKER, canonical_product_url, product_key
+from settings import apply_settings, load_settings
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+CHUNK_SIZE = 64 * 1024
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+class SitemapCrawler:
+    """Streams robots.txt and sitemap XML (plain or gzipped) and collects product URLs without buffering documents."""
+
+    def __init__(self, base_url: str, concurrency: int = 8, timeout: float = 60):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.product_urls: Set[str] = set()
+        self.visited: Set[str] = set()
+        self.failed = 0
+
+    async def sitemaps_from_robots(self, session: aiohttp.ClientSession) -> List[str]:
+        sitemaps = []
+        try:
+            async with session.get(urljoin(self.base_url, '/robots.txt')) as response:
+                response.raise_for_status()
+                async for raw_line in response.content:
+                    line = raw_line.decode('utf-8', errors='replace').strip()
+                    if line.lower().startswith('sitemap:'):
+                        sitemaps.append(line.split(':', 1)[1].strip())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Without a readable robots.txt the conventional location is still worth a try
+            logger.warning(f"Could not read robots.txt: {e}")
+
+        logger.info(f"robots.txt lists {len(sitemaps)} sitemaps")
+        return sitemaps or [urljoin(self.base_url, '/sitemap.xml')]
+
+    async def parse_sitemap(self, session: aiohttp.ClientSession, url: str, queue: asyncio.Queue):
+        parser = XMLPullParser(events=('start', 'end'))
+        decompressor = None
+        found = 0
+        # Holds the document root once its start tag is read; per call, since workers parse shards concurrently
+        root: List[Element] = []
+
+        async with session.get(url) as response:
+            response.raise_for_status()
+            first_chunk = True
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                if first_chunk:
+                    # .xml.gz shards arrive as raw gzip rather than with a Content-Encoding header
+                    if chunk.startswith(GZIP_MAGIC):
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    first_chunk = False
+                parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+                found += self._drain_events(parser, queue, root)
+
+        if decompressor:
+            parser.feed(decompressor.flush())
+        parser.close()
+        found += self._drain_events(parser, queue, root)
+        logger.info(f"Parsed {url}: {found} entries")
+
+    def _drain_events(self, parser: XMLPullParser, queue: asyncio.Queue, root: List[Element]) -> int:
+        found = 0
+        for event, element in parser.read_events():
+            if event == 'start':
+                if not root:
+                    root.append(element)
+                continue
+
+            name = _local_name(element.tag)
+            if name not in ('url', 'sitemap'):
+                continue
+
+            location = (element.findtext('{*}loc') or '').strip()
+            # Finished entries are emptied and detached from the root, so memory stays flat across large shards;
+            # an entry still being parsed keeps filling in through the parser even once detached
+            element.clear()
+            root[0].clear()
+            if not location:
+                continue
+
+            found += 1
+            if name == 'sitemap':
+                if location not in self.visited:
+                    self.visited.add(location)
+                    queue.put_nowait(location)
+            elif PRODUCT_PATH_MARKER in urlsplit(location).path:
+                self.product_urls.add(canonical_product_url(location))
+        return found
+
+    async def crawl(self) -> List[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        headers = {'User-Agent': SCRAPER_CONFIG['user_agent']} if SCRAPER_CONFIG['user_agent'] else None
+
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=headers) as session:
+            for sitemap in await self.sitemaps_from_robots(session):
+                if sitemap not in self.visited:
+                    self.visited.add(sitemap)
+                    queue.put_nowait(sitemap)
+
+            async def worker():
+                while True:
+                    url = await queue.get()
+                    try:
+                        await self.parse_sitemap(session, url, queue)
+                    except (aiohttp.ClientError, asyncio.TimeoutError, ParseError, zlib.error) as e:
+                        self.failed += 1
+                        logger.warning(f"Failed to read sitemap {url}: {e}")
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            await queue.join()
+            for worker_task in workers:
+                worker_task.cancel()
+
+        logger.info(
+            f"Sitemap crawl finished: {len(self.visited)} sitemaps, {self.failed} failed, "
+            f"{len(self.product_urls)} product URLs"
+        )
+        return sorted(self.product_urls)
+
+
+def merge_into_catalog(links: List[str], path: str) -> List[str]:
+    """Unions links into the catalog link file that store_sweep reads, keeping existing order first."""
+    existing = []
+    if os.path.exists(path):
+        existing = pd.read_csv(path).iloc[:, 0].dropna().tolist()
+
+    # Keyed by UPC so a product found under two slugs is listed once, under the link seen first
+    by_product = {}
+    for link in existing + links:
+        by_product.setdefault(product_key(link), canonical_product_url(link))
+    merged = list(by_product.values())
+    pd.DataFrame({'product_link': merged}).to_csv(path, index=False)
+    logger.info(f"Catalog {path} now holds {len(merged)} links ({len(merged) - len(existing)} new)")
+    return merged
+
+
+async def discover_from_sitemaps(base_url: str, concurrency: Optional[int] = None) -> List[str]:
+    return await SitemapCrawler(base_url, concurrency or SCRAPER_CONFIG['sitemap_concurrency']).crawl()
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="List product URLs from the site's sitemaps")
+    parser.add_argument('--concurrency', type=int, help="Shorthand for --sitemap-concurrency")
+    args, remaining = parser.parse_known_args(argv)
+
+    settings = load_settings(remaining)
+    apply_settings(settings)
+
+    links = await discover_from_sitemaps(settings.base_url, args.concurrency)
+    if links:
+        merge_into_catalog(links, settings.catalog_file)
+    else:
+        logger.warning("No product URLs found in sitemaps")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class YieldStopPolicy:
+    """Decides when another Load More click is unlikely to be worth it for the current category."""
+
+    def __init__(self, window: int = 5, min_yield: float = 2.0, time_budget: float = 1800, grace_clicks: int = 3):
+        self.window = window
+        self.min_yield = min_yield
+        self.time_budget = time_budget
+        self.grace_clicks = grace_clicks
+        self._yields: Deque[int] = deque(maxlen=window)
+        self._started = time.monotonic()
+        self.clicks = 0
+        self.total_new = 0
+
+    def record(self, new_links: int):
+        self._yields.append(new_links)
+        self.clicks += 1
+        self.total_new += new_links
+
+    @property
+    def recent_yield(self) -> float:
+        return sum(self._yields) / len(self._yields) if self._yields else 0.0
+
+    def stop_reason(self) -> Optional[str]:
+        elapsed = time.monotonic() - self._started
+        if elapsed >= self.time_budget:
+            return f"time budget of {self.time_budget:.0f}s used ({elapsed:.0f}s elapsed)"
+
+        # Early pages can be all repeats of an overlapping category; give the grid a few clicks first
+        if self.clicks < max(self.grace_clicks, self.window):
+            return None
+
+        if self.recent_yield < self.min_yield:
+            return (
+                f"yield fell to {self.recent_yield:.1f} new links per click over the last {len(self._yields)} clicks "
+                f"(threshold {self.min_yield})"
+            )
+        return None
+
+    def should_stop(self, category: str) -> bool:
+        reason = self.stop_reason()
+        if reason:
+            logger.info(
+                f"Stopping category {category} after {self.clicks} pages and {self.total_new} new links: {reason}"
+            )
+            return True
+
+        logger.debug(f"Continuing category {category}: recent yield {self.recent_yield:.1f} per click")
+        return False
+
+
+def yield_stop_policy(config: dict) -> YieldStopPolicy:
+    return YieldStopPolicy(
+        window=config['yield_window'],
+        min_yield=config['min_yield_per_click'],
+        time_budget=config['category_time_budget_seconds'],
+        grace_clicks=config['yield_grace_clicks']
+    )
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from selenium.webdriver import Chrome
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException
+)
+
+logger = logging.getLogger(__name__)
+
+MODALITY_BUTTON_ID = "CurrentModality-button-A11Y-FOCUS-ID"
+
+READ_LOCAL_STORAGE_SCRIPT = """
+const items = {};
+for (let i = 0; i < window.localStorage.length; i++) {
+    const key = window.localStorage.key(i);
+    items[key] = window.localStorage.getItem(key);
+}
+return items;
+"""
+
+WRITE_LOCAL_STORAGE_SCRIPT = """
+for (const [key, value] of Object.entries(arguments[0])) {
+    window.localStorage.setItem(key, value);
+}
+"""
+
+
+class StoreSessionCache:
+    """Replays the cookies and localStorage the modality dialog leaves behind for a store."""
+
+    def __init__(self, cache_dir: str, max_age_hours: float = 24, element_wait: float = 10):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_age_seconds = max_age_hours * 3600
+        self.element_wait = element_wait
+
+    def _path(self, store_id: str) -> str:
+        return os.path.join(self.cache_dir, f'{store_id}.json')
+
+    @staticmethod
+    def _modality_label(driver: Chrome) -> Optional[str]:
+        try:
+            return driver.find_element(By.ID, MODALITY_BUTTON_ID).text.strip() or None
+        except (NoSuchElementException, StaleElementReferenceException):
+            return None
+
+    def capture(self, driver: Chrome, store_id: str) -> bool:
+        try:
+            snapshot = {
+                'store_id': store_id,
+                'captured_at': time.time(),
+                'modality_label': self._modality_label(driver),
+                'cookies': driver.get_cookies(),
+                'local_storage': driver.execute_script(READ_LOCAL_STORAGE_SCRIPT)
+            }
+        except WebDriverException as e:
+            logger.warning(f"Could not capture store session for {store_id}: {e}")
+            return False
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging_path = f'{self._path(store_id)}.tmp'
+        with open(staging_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(staging_path, self._path(store_id))
+
+        logger.info(f"Captured store session for {store_id}")
+        return True
+
+    def load(self, store_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(store_id)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - snapshot.get('captured_at', 0) > self.max_age_seconds:
+            logger.info(f"Store session for {store_id} is stale")
+            return None
+        return snapshot
+
+    def apply(self, driver: Chrome, store_id: str) -> bool:
+        snapshot = self.load(store_id)
+        if not snapshot:
+            return False
+
+        try:
+            for cookie in snapshot['cookies']:
+                cookie = {key: value for key, value in cookie.items() if key != 'expiry'}
+                try:
+                    driver.add_cookie(cookie)
+                except WebDriverException as e:
+                    # Usually a domain mismatch: the page is not on the site the session was captured from.
+                    # A partial cookie set would only half-apply the store, so the dialog is used instead
+                    logger.warning(f"Could not set cookie {cookie.get('name')} for store {store_id}: {e.msg or e}")
+                    return False
+
+            driver.execute_script(WRITE_LOCAL_STORAGE_SCRIPT, snapshot['local_storage'])
+            driver.refresh()
+
+        except WebDriverException as e:
+            logger.warning(f"Could not apply store session for {store_id}: {e}")
+            return False
+
+        return self.verify(driver, snapshot)
+
+    def verify(self, driver: Chrome, snapshot: Dict) -> bool:
+        expected = snapshot.get('modality_label')
+        if expected:
+            # The header renders after the refresh, first with a placeholder; give it time to show the store
+            try:
+                WebDriverWait(driver, self.element_wait).until(lambda d: self._modality_label(d) == expected)
+            except TimeoutException:
+                pass
+        label = self._modality_label(driver)
+
+        if expected and label == expected:
+            logger.info(f"Store {snapshot['store_id']} applied directly ({label})")
+            return True
+
+        logger.info(f"Store session for {snapshot['store_id']} did not take effect (got {label!r}, expected {expected!r})")
+        return False
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+from config import STORES, SCRAPER_CONFIG
+from catalog_db import CatalogStore
+from price_history import PriceHistory
+from Godly import MarianosScraper
+from product_records import ProductRecords
+from settings import apply_settings, load_settings
+
+logger = logging.getLogger(__name__)
+
+
+class StorePriceScraper(MarianosScraper):
+    """Collects only the store-specific fields (price, promo, aisle location) for a known catalog."""
+
+    def read_store_fields(self) -> Optional[Dict]:
+        try:
+            upc = self.driver.find_element(By.CSS_SELECTOR, 'span[data-testid="product-details-upc"]').text.replace("UPC: ", "")
+        except NoSuchElementException:
+            return None
+
+        try:
+            price_element = self.driver.find_element(By.CSS_SELECTOR, '[typeof="Price"]')
+            price = f"${price_element.get_attribute('value')}"
+        except NoSuchElementException:
+            price = "Price Not Available"
+
+        try:
+            promo_element = self.driver.find_element(By.CSS_SELECTOR, 'mark.kds-Price-promotional')
+            dollars = promo_element.find_element(By.CSS_SELECTOR, 'span.kds-Price-promotional-dropCaps').text
+            cents = promo_element.find_element(By.CSS_SELECTOR, 'sup.kds-Price-superscript').text.replace(".", "")
+            promo = f"${dollars}.{cents}"
+        except NoSuchElementException:
+            promo = ""
+
+        try:
+            location = self.driver.find_element(By.CSS_SELECTOR, 'span[data-testid="product-details-location"]').text
+        except NoSuchElementException:
+            location = ""
+
+        return {
+            'UPC': f"#{upc}",
+            'Price': price,
+            'Promo Price': promo,
+            'Location': location
+        }
+
+    async def scrape_store_prices(self, links: List[str]) -> ProductRecords:
+        rows = ProductRecords()
+        for link in links:
+            if not await self.visit_website(link, max_retries=2):
+                continue
+
+            fields = await asyncio.to_thread(self.read_store_fields)
+            if fields:
+                rows.append({'Store ID': self.store_id, 'Product Link': link, **fields})
+
+        logger.info(f"Collected {len(rows)} prices for store {self.store_id}")
+        return rows
+
+
+def load_catalog(path: str) -> List[str]:
+    df = pd.read_csv(path)
+    # Link files written by the different scrapers name the column differently
+    return df.iloc[:, 0].dropna().drop_duplicates().tolist()
+
+
+async def discover_catalog(store: Dict) -> List[str]:
+    catalog_file = SCRAPER_CONFIG['catalog_file']
+    if os.path.exists(catalog_file):
+        links = load_catalog(catalog_file)
+        logger.info(f"Loaded {len(links)} catalog links from {catalog_file}")
+        return links
+
+    scraper = MarianosScraper(
+        headless=SCRAPER_CONFIG.get('headless', False),
+        zip_code=store['zip_code'],
+        store_id=store['store_id']
+    )
+    links = await scraper.scrape()
+    if links:
+        pd.DataFrame({'product_link': links}).to_csv(catalog_file, index=False)
+        logger.info(f"Saved {len(links)} catalog links to {catalog_file}")
+    return links
+
+
+async def sweep_store(store: Dict, links: List[str], semaphore: asyncio.Semaphore) -> List[Dict]:
+    async with semaphore:
+        scraper = StorePriceScraper(
+            headless=SCRAPER_CONFIG.get('headless', False),
+            zip_code=store['zip_code'],
+            store_id=store['store_id']
+        )
+        try:
+            # Prices from the wrong store are worse than none, so the store must be selected
+            if not await scraper.start_session(require_store=True):
+                return []
+            return await scraper.scrape_store_prices(links)
+
+        except Exception as e:
+            logger.error(f"Error sweeping store {store['store_id']}: {e}")
+            return []
+
+        finally:
+            scraper.close()
+
+
+async def sweep(stores: List[Dict]) -> ProductRecords:
+    links = await discover_catalog(stores[0])
+    if not links:
+        logger.warning("No catalog links to sweep")
+        return ProductRecords()
+
+    semaphore = asyncio.Semaphore(SCRAPER_CONFIG['store_workers'])
+    results = await asyncio.gather(*(sweep_store(store, links, semaphore) for store in stores))
+    combined = ProductRecords()
+    for rows in results:
+        combined.extend(rows)
+    return combined
+
+
+async def main(argv: Optional[List[str]] = None):
+    apply_settings(load_settings(argv))
+
+    rows = await sweep(STORES)
+    if rows:
+        output_file = SCRAPER_CONFIG['store_prices_file']
+        rows.to_dataframe().to_csv(output_file, index=False)
+        logger.info(f"Saved {len(rows)} store prices to {output_file}")
+
+        catalog = CatalogStore(SCRAPER_CONFIG['catalog_db'])
+        try:
+            stored = catalog.record_observations(rows, store_id=SCRAPER_CONFIG['store_id'])
+            logger.info(f"Stored {stored} price observations in {SCRAPER_CONFIG['catalog_db']}")
+        finally:
+            catalog.close()
+        PriceHistory(SCRAPER_CONFIG['price_history_dir']).append(rows, store_id=SCRAPER_CONFIG['store_id'])
+    else:
+        logger.warning("No store prices were collected")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -21,6 +21,9 @@ import undetected_chromedriver as uc
 import pandas as pd
 
 from config import PRODUCT_CATEGORIES, SCRAPER_CONFIG
+from product_records import ProductRecords
+from popup_guard import install_popup_guard
+from rate_control import ThrottledError, is_throttled_page, shared_rate_controller
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -44,9 +47,11 @@ class MarianosScraper:
         self.timeout = timeout
         self.zip_code = zip_code
         self.driver: Optional[Chrome] = None
+        self.popup_guard_installed = False
         self.all_product_links: List[str] = []
         self.unique_product_links: set = set()
-        self.product_data: List[Dict] = []
+        self.product_data = ProductRecords()
+        self.rate = shared_rate_controller(SCRAPER_CONFIG)
 
     @staticmethod
     def _generate_user_agent() -> str:
@@ -78,12 +83,34 @@ class MarianosScraper:
         try:
             options = self._setup_driver_options()
             self.driver = uc.Chrome(options=options)
+            # Dismisses the Qualtrics survey as soon as it appears instead of polling for it every page
+            self.popup_guard_installed = install_popup_guard(self.driver)
             logger.info("Driver setup complete")
             return self.driver
         except WebDriverException as e:
             logger.error(f"Error setting up undetectable webdriver: {e}")
             return None
 
+    async def load_page(self, url: str):
+        # Paced by the shared rate controller; the load time it measures is what the rate adapts to
+        await self.rate.acquire()
+        started = time.monotonic()
+        try:
+            self.driver.get(url)
+            WebDriverWait(self.driver, self.timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            if is_throttled_page(self.driver.title):
+                self.rate.record_error(throttled=True)
+                raise ThrottledError(f"Throttled while loading {url}")
+        except ThrottledError:
+            raise
+        except Exception:
+            self.rate.record_error()
+            raise
+
+        self.rate.record_success(time.monotonic() - started)
+
     async def visit_website(self, url: str, max_retries: int = 3) -> bool:
         if not self.driver:
             logger.error("Driver not initialized")
@@ -92,14 +119,8 @@ class MarianosScraper:
         for attempt in range(max_retries):
             try:
                 logger.info(f"Visiting {url}... (Attempt {attempt + 1})")
-                self.driver.get(url)
-
-                WebDriverWait(self.driver, self.timeout).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-                
+                await self.load_page(url)
                 logger.info(f"Successfully loaded {url}")
-                await asyncio.sleep(random.uniform(2, 5))
                 return True
             
             except Exception as e:
@@ -108,8 +129,6 @@ class MarianosScraper:
                 if attempt == max_retries - 1:
                     logger.error(f"Failed to load {url} after {max_retries} attempts")
                     return False
-                
-                await asyncio.sleep(random.uniform(3, 7))
 
     async def dismiss_qualtrics_popup(self) -> bool:
         try:
@@ -136,6 +155,11 @@ class MarianosScraper:
             logger.warning(f"Error handling Qualtrics popup: {e}")
             return False
 
+    async def dismiss_popup_if_unguarded(self):
+        # Only poll for the popup when the in-page watcher could not be installed
+        if not self.popup_guard_installed:
+            await self.dismiss_qualtrics_popup()
+
     async def type_like_human(self, element, text: str, delay: float = 0.2):
         for char in text:
             element.send_keys(char)
@@ -231,22 +255,33 @@ class MarianosScraper:
             logger.error(f"Error extracting product links: {e}")
             return []
 
+    def grid_cell_count(self) -> int:
+        return self.driver.execute_script(
+            "return document.querySelectorAll('div[data-testid=\"auto-grid-cell\"]').length;"
+        )
+
     async def click_load_more(self) -> bool:
         try:
             load_more_button = WebDriverWait(self.driver, 10).until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button'))
             )
             self.driver.execute_script(
-                "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", 
+                "arguments[0].scrollIntoView({block: 'center'});", 
                 load_more_button
-            )           
-            await asyncio.sleep(random.uniform(1.5, 3.5))
+            )
+            await self.rate.acquire()
+            cells_before = self.grid_cell_count()
+            started = time.monotonic()
             load_more_button.click()
             logger.info("Clicked 'Load More' button")
-            await asyncio.sleep(random.uniform(5, 10))
-            WebDriverWait(self.driver, self.timeout).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )            
+
+            # The time until new cells render is the page latency the rate controller adapts to
+            try:
+                WebDriverWait(self.driver, self.timeout).until(lambda d: self.grid_cell_count() > cells_before)
+                self.rate.record_success(time.monotonic() - started)
+            except TimeoutException:
+                logger.warning("No new products appeared after clicking 'Load More'")
+                self.rate.record_error(throttled=is_throttled_page(self.driver.title))
             return True
         
         except (TimeoutException, NoSuchElementException):
@@ -275,18 +310,25 @@ class MarianosScraper:
             search_input.clear()
             search_input.clear()
             await self.type_like_human(search_input, category)
+            await self.rate.acquire()
+            started = time.monotonic()
             search_input.send_keys(Keys.RETURN)
             
             logger.info(f"Searched for category: {category}")
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['search_delay']))
 
+            # Wait for the grid itself rather than a fixed delay, and report how long it took
             WebDriverWait(self.driver, self.timeout).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
+            WebDriverWait(self.driver, self.timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
+            )
+            self.rate.record_success(time.monotonic() - started)
             return True
         
         except Exception as e:
             logger.error(f"Error searching for category {category}: {e}")
+            self.rate.record_error()
             return False
 
     async def scrape_category(self, category: str) -> List[str]:
@@ -297,7 +339,7 @@ class MarianosScraper:
         page_loads = 0
         
         while page_loads < SCRAPER_CONFIG['max_page_loads_per_category']:
-            await self.dismiss_qualtrics_popup()
+            await self.dismiss_popup_if_unguarded()
             
             # Get current page links
             current_page_links = self.extract_product_links()
@@ -310,8 +352,6 @@ class MarianosScraper:
             # Check if there are more pages to load
             if not await self.click_load_more():
                 break
-                
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['load_more_delay']))
             
             page_loads += 1
             logger.info(f"Loaded page {page_loads} for category {category}")
@@ -342,15 +382,13 @@ class MarianosScraper:
             for link in links:
                 try:
                     logger.info(f"Visiting product link: {link}")
-                    self.driver.get(link)
+                    await self.load_page(link)
                     
                     # Call the product detail scraping method
                     product_detail = await self.scrape_product_details()
                     
                     if product_detail:
                         processed_links.append(link)
-                    
-                    await asyncio.sleep(random.uniform(2, 5))
                 
                 except Exception as e:
                     logger.error(f"Error processing product link {link}: {e}")
@@ -384,10 +422,12 @@ class MarianosScraper:
             except Exception as cleanup_error:
                 logger.error(f"Error during cleanup: {cleanup_error}")
 
-    product_data = []
     async def scrape_product_details(self):
         try:
-            await asyncio.sleep(10)
+            # The name renders after readyState; wait for it instead of a fixed delay
+            WebDriverWait(self.driver, SCRAPER_CONFIG['element_wait']).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]'))
+            )
             
             # Get product details
             product_name = self.driver.find_element(By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]').text
@@ -430,7 +470,7 @@ class MarianosScraper:
             except NoSuchElementException:
                 image_url = "No image available"
 
-            # Append data to the class-level product_data list
+            # Append data to this scraper's product records
             product_detail = {
                 'UPC': upc,
                 'Category': category,
@@ -453,7 +493,7 @@ class MarianosScraper:
     
     def save_to_excel(data, filename="product_details.xlsx"):
         # Create DataFrame
-        df = pd.DataFrame(data)
+        df = data.to_dataframe()
         
         # Create Excel writer object with xlsxwriter engine
         writer = pd.ExcelWriter(filename, engine='xlsxwriter')
@@ -504,7 +544,7 @@ class MarianosScraper:
             if not await self.visit_website(self.base_url):
                 return []
 
-            await self.dismiss_qualtrics_popup()
+            await self.dismiss_popup_if_unguarded()
             
             if self.zip_code:
                 store_selected = await self.select_store()
@@ -1,6 +1,7 @@
 import asyncio
 import random
 import logging
+import time
 from typing import List, Optional
 
 from selenium.webdriver import Chrome
@@ -19,6 +20,8 @@ import undetected_chromedriver as uc
 import pandas as pd
 
 from config import PRODUCT_CATEGORIES, SCRAPER_CONFIG
+from popup_guard import install_popup_guard
+from rate_control import ThrottledError, is_throttled_page, shared_rate_controller
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -42,8 +45,10 @@ class MarianosScraper:
         self.timeout = timeout
         self.zip_code = zip_code
         self.driver: Optional[Chrome] = None
+        self.popup_guard_installed = False
         self.all_product_links: List[str] = []
         self.unique_product_links: set = set()
+        self.rate = shared_rate_controller(SCRAPER_CONFIG)
 
     @staticmethod
     def _generate_user_agent() -> str:
@@ -75,12 +80,34 @@ class MarianosScraper:
         try:
             options = self._setup_driver_options()
             self.driver = uc.Chrome(options=options)
+            # Dismisses the Qualtrics survey as soon as it appears instead of polling for it every page
+            self.popup_guard_installed = install_popup_guard(self.driver)
             logger.info("Driver setup complete")
             return self.driver
         except WebDriverException as e:
             logger.error(f"Error setting up undetectable webdriver: {e}")
             return None
 
+    async def load_page(self, url: str):
+        # Paced by the shared rate controller; the load time it measures is what the rate adapts to
+        await self.rate.acquire()
+        started = time.monotonic()
+        try:
+            self.driver.get(url)
+            WebDriverWait(self.driver, self.timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            if is_throttled_page(self.driver.title):
+                self.rate.record_error(throttled=True)
+                raise ThrottledError(f"Throttled while loading {url}")
+        except ThrottledError:
+            raise
+        except Exception:
+            self.rate.record_error()
+            raise
+
+        self.rate.record_success(time.monotonic() - started)
+
     async def visit_website(self, url: str, max_retries: int = 3) -> bool:
         if not self.driver:
             logger.error("Driver not initialized")
@@ -89,14 +116,8 @@ class MarianosScraper:
         for attempt in range(max_retries):
             try:
                 logger.info(f"Visiting {url}... (Attempt {attempt + 1})")
-                self.driver.get(url)
-
-                WebDriverWait(self.driver, self.timeout).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-                
+                await self.load_page(url)
                 logger.info(f"Successfully loaded {url}")
-                await asyncio.sleep(random.uniform(2, 5))
                 return True
             
             except Exception as e:
@@ -105,8 +126,6 @@ class MarianosScraper:
                 if attempt == max_retries - 1:
                     logger.error(f"Failed to load {url} after {max_retries} attempts")
                     return False
-                
-                await asyncio.sleep(random.uniform(3, 7))
 
     async def dismiss_qualtrics_popup(self) -> bool:
         try:
@@ -133,6 +152,11 @@ class MarianosScraper:
             logger.warning(f"Error handling Qualtrics popup: {e}")
             return False
 
+    async def dismiss_popup_if_unguarded(self):
+        # Only poll for the popup when the in-page watcher could not be installed
+        if not self.popup_guard_installed:
+            await self.dismiss_qualtrics_popup()
+
     async def type_like_human(self, element, text: str, delay: float = 0.2):
         for char in text:
             element.send_keys(char)
@@ -228,22 +252,33 @@ class MarianosScraper:
             logger.error(f"Error extracting product links: {e}")
             return []
 
+    def grid_cell_count(self) -> int:
+        return self.driver.execute_script(
+            "return document.querySelectorAll('div[data-testid=\"auto-grid-cell\"]').length;"
+        )
+
     async def click_load_more(self) -> bool:
         try:
             load_more_button = WebDriverWait(self.driver, 10).until(
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button'))
             )
             self.driver.execute_script(
-                "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", 
+                "arguments[0].scrollIntoView({block: 'center'});", 
                 load_more_button
-            )           
-            await asyncio.sleep(random.uniform(1.5, 3.5))
+            )
+            await self.rate.acquire()
+            cells_before = self.grid_cell_count()
+            started = time.monotonic()
             load_more_button.click()
             logger.info("Clicked 'Load More' button")
-            await asyncio.sleep(random.uniform(5, 10))
-            WebDriverWait(self.driver, self.timeout).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )            
+
+            # The time until new cells render is the page latency the rate controller adapts to
+            try:
+                WebDriverWait(self.driver, self.timeout).until(lambda d: self.grid_cell_count() > cells_before)
+                self.rate.record_success(time.monotonic() - started)
+            except TimeoutException:
+                logger.warning("No new products appeared after clicking 'Load More'")
+                self.rate.record_error(throttled=is_throttled_page(self.driver.title))
             return True
         
         except (TimeoutException, NoSuchElementException):
@@ -272,18 +307,25 @@ class MarianosScraper:
             search_input.clear()
             search_input.clear()
             await self.type_like_human(search_input, category)
+            await self.rate.acquire()
+            started = time.monotonic()
             search_input.send_keys(Keys.RETURN)
             
             logger.info(f"Searched for category: {category}")
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['search_delay']))
 
+            # Wait for the grid itself rather than a fixed delay, and report how long it took
             WebDriverWait(self.driver, self.timeout).until(
                 lambda d: d.execute_script("return document.readyState") == "complete"
             )
+            WebDriverWait(self.driver, self.timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
+            )
+            self.rate.record_success(time.monotonic() - started)
             return True
         
         except Exception as e:
             logger.error(f"Error searching for category {category}: {e}")
+            self.rate.record_error()
             return False
 
     async def scrape_category(self, category: str) -> List[str]:
@@ -294,13 +336,11 @@ class MarianosScraper:
         page_loads = 0
         
         while page_loads < SCRAPER_CONFIG['max_page_loads_per_category']:
-            await self.dismiss_qualtrics_popup()
+            await self.dismiss_popup_if_unguarded()
             new_links = self.extract_product_links()
             category_links.extend(new_links)
             if not await self.click_load_more():
                 break
-                
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['load_more_delay']))
             
             page_loads += 1
             logger.info(f"Loaded page {page_loads} for category {category}")
@@ -317,7 +357,7 @@ class MarianosScraper:
             if not await self.visit_website(self.base_url):
                 return []
 
-            await self.dismiss_qualtrics_popup()
+            await self.dismiss_popup_if_unguarded()
             
             if self.zip_code:
                 store_selected = await self.select_store()
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+import work_queue
+from work_queue import LeaseKeeper, RedisWorkQueue, SQLiteWorkQueue
+
+# Point this at a disposable local server (e.g. redis-server --port 6390) to run the Redis cases too
+REDIS_URL = os.environ.get('MARIANO_TEST_REDIS_URL')
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(work_queue.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def make_queue(request, tmp_path):
+    queues = []
+
+    def make(lease_seconds: float = 60, max_attempts: int = 3):
+        if request.param == 'sqlite':
+            queue = SQLiteWorkQueue(str(tmp_path / 'queue.db'), lease_seconds, max_attempts)
+        else:
+            if not REDIS_URL or work_queue.redis is None:
+                pytest.skip("set MARIANO_TEST_REDIS_URL and install redis to run the Redis backend")
+            queue = RedisWorkQueue(REDIS_URL, prefix=f'test-{uuid.uuid4().hex}', lease_seconds=lease_seconds,
+                                   max_attempts=max_attempts)
+        queues.append(queue)
+        return queue
+
+    yield make
+
+    for queue in queues:
+        if isinstance(queue, RedisWorkQueue):
+            keys = list(queue.client.scan_iter(f'{queue.prefix}:*'))
+            if keys:
+                queue.client.delete(*keys)
+        queue.close()
+
+
+def test_enqueue_collapses_duplicate_payloads(make_queue):
+    queue = make_queue()
+
+    assert queue.enqueue('page', [{'page': 1}, {'page': 2}]) == 2
+    assert queue.enqueue('page', [{'page': 2}, {'page': 1}, {'page': 3}]) == 1
+    assert queue.counts('page') == {'pending': 3}
+
+
+def test_leased_task_is_not_handed_out_twice(make_queue, clock):
+    queue = make_queue()
+    queue.enqueue('page', [{'page': 1}])
+
+    task = queue.claim('a', 'page')
+    assert task.payload == {'page': 1}
+    assert task.attempts == 1
+    assert queue.claim('b', 'page') is None
+    assert queue.counts('page') == {'leased': 1}
+
+
+def test_heartbeat_extends_only_the_owners_lease(make_queue, clock):
+    queue = make_queue(lease_seconds=60)
+    queue.enqueue('page', [{'page': 1}])
+    task = queue.claim('a', 'page')
+
+    clock.advance(45)
+    assert queue.heartbeat(task, 'a')
+    assert not queue.heartbeat(task, 'b')
+
+    # Past the original expiry but inside the renewed lease
+    clock.advance(45)
+    assert queue.claim('b', 'page') is None
+
+
+def test_expired_lease_is_handed_over(make_queue, clock):
+    queue = make_queue(lease_seconds=60)
+    queue.enqueue('page', [{'page': 1}])
+    stale = queue.claim('a', 'page')
+
+    clock.advance(61)
+    task = queue.claim('b', 'page')
+    assert task.id == stale.id
+    assert task.attempts == 2
+
+    # The previous holder can neither renew nor finish a task it no longer owns
+    assert not queue.heartbeat(stale, 'a')
+    assert not queue.complete(stale, 'a', ['late'])
+    assert queue.complete(task, 'b', ['link'])
+    assert queue.results('page') == [['link']]
+    assert queue.counts('page') == {'done': 1}
+
+
+def test_expired_lease_on_last_attempt_fails_the_task(make_queue, clock):
+    queue = make_queue(lease_seconds=60, max_attempts=2)
+    queue.enqueue('page', [{'page': 1}])
+
+    for worker in ('a', 'b'):
+        assert queue.claim(worker, 'page') is not None
+        clock.advance(61)
+
+    assert queue.claim('c', 'page') is None
+    assert queue.counts('page') == {'failed': 1}
+
+
+def test_fail_requeues_until_attempts_run_out(make_queue, clock):
+    queue = make_queue(max_attempts=2)
+    queue.enqueue('page', [{'page': 1}])
+
+    task = queue.claim('a', 'page')
+    assert queue.fail(task, 'a', 'timeout')
+    assert queue.counts('page') == {'pending': 1}
+
+    task = queue.claim('a', 'page')
+    assert queue.fail(task, 'a', 'timeout')
+    assert queue.claim('a', 'page') is None
+    assert queue.counts('page') == {'failed': 1}
+
+
+def test_lease_keeper_holds_the_lease_while_work_runs(make_queue):
+    queue = make_queue(lease_seconds=0.3)
+    queue.enqueue('page', [{'page': 1}])
+    task = queue.claim('a', 'page')
+
+    async def work():
+        async with LeaseKeeper(queue, task, 'a') as lease:
+            await asyncio.sleep(1)
+            assert queue.claim('b', 'page') is None
+        return lease
+
+    assert not asyncio.run(work()).lost
+    assert queue.complete(task, 'a', [])
+
+
+def test_lease_keeper_notices_a_lost_lease(make_queue, clock):
+    queue = make_queue(lease_seconds=0.3)
+    queue.enqueue('page', [{'page': 1}])
+    task = queue.claim('a', 'page')
+    clock.advance(1)
+    assert queue.claim('b', 'page') is not None
+
+    async def work():
+        async with LeaseKeeper(queue, task, 'a') as lease:
+            await asyncio.sleep(0.3)
+        return lease
+
+    assert asyncio.run(work()).lost
+
+
+def test_runs_do_not_share_tasks(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    first = SQLiteWorkQueue(path, run='2025-01-01')
+    second = SQLiteWorkQueue(path, run='2025-01-02')
+    try:
+        first.enqueue('page', [{'page': 1}])
+        task = first.claim('a', 'page')
+        assert first.complete(task, 'a', ['link'])
+
+        # A later run enqueues the same payload again instead of finding it already done
+        assert second.enqueue('page', [{'page': 1}]) == 1
+        assert second.claim('a', 'page').kind == 'page'
+        assert first.counts('page') == {'done': 1}
+    finally:
+        first.close()
+        second.close()
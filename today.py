@@ -1,6 +1,8 @@
 import asyncio
 import random
 import logging
+import time
+from collections import deque
 from typing import List, Optional, Dict
 
 from selenium.webdriver import Chrome
@@ -19,6 +21,18 @@ import undetected_chromedriver as uc
 import pandas as pd
 
 from config import PRODUCT_CATEGORIES, SCRAPER_CONFIG
+from catalog_db import CatalogStore
+from price_diff import diff_snapshots, read_snapshot, write_report
+from price_history import PriceHistory
+from pager import resume_category_grid
+from pipeline import LinkPipeline
+from driver_supervisor import CrashSupervisor
+from retry_policy import is_permanent
+from product_records import ProductRecords
+from product_urls import canonical_product_url
+from settings import apply_settings, load_settings
+from popup_guard import install_popup_guard
+from rate_control import ThrottledError, is_throttled_page, shared_rate_controller
 
 logging.basicConfig(
     level=logging.INFO, 
@@ -42,9 +56,16 @@ class MarianosScraper:
         self.timeout = timeout
         self.zip_code = zip_code
         self.driver: Optional[Chrome] = None
+        self.popup_guard_installed = False
         self.all_product_links: List[str] = []
         self.unique_product_links: set = set()
-        self.product_data: List[Dict] = []
+        self.product_data = ProductRecords()
+        self.supervisor = CrashSupervisor(
+            SCRAPER_CONFIG['max_driver_restarts'],
+            reset_after=SCRAPER_CONFIG['driver_restart_reset_seconds']
+        )
+        self.rate = shared_rate_controller(SCRAPER_CONFIG)
+        self.link_pipeline: Optional[LinkPipeline] = None
 
     @staticmethod
     def _generate_user_agent() -> str:
@@ -96,15 +117,31 @@ class MarianosScraper:
             logger.warning(f"Error handling Qualtrics popup: {e}")
             return False
 
+    async def dismiss_popup_if_unguarded(self):
+        # Only poll for the popup when the in-page watcher could not be installed
+        if not self.popup_guard_installed:
+            await self.dismiss_qualtrics_popup()
+
     async def type_like_human(self, element, text: str, delay: float = 0.2):
         for char in text:
             element.send_keys(char)
             await asyncio.sleep(delay)
 
     async def scrape_product_details(self, link: str) -> Optional[Dict]:
+        # The name renders after readyState; a page without it is left for read_product_details to report
+        try:
+            await asyncio.to_thread(
+                WebDriverWait(self.driver, SCRAPER_CONFIG['element_wait']).until,
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]'))
+            )
+        except TimeoutException:
+            pass
+
+        # Selenium calls block; running them in a thread lets other sessions' coroutines proceed meanwhile
+        return await asyncio.to_thread(self.read_product_details, link)
+
+    def read_product_details(self, link: str) -> Optional[Dict]:
         try:
-            await asyncio.sleep(3)  # Allow page to load
-            
             # Get product details
             product_name = self.driver.find_element(By.CSS_SELECTOR, 'h1[data-testid="product-details-name"]').text
             upc = self.driver.find_element(By.CSS_SELECTOR, 'span[data-testid="product-details-upc"]').text.replace("UPC: ", "")
@@ -129,13 +166,16 @@ class MarianosScraper:
                 price_element = self.driver.find_element(By.CSS_SELECTOR, '[typeof="Price"]')
                 price = f"${price_element.get_attribute('value')}"
             except NoSuchElementException:
-                try:
-                    price_element = self.driver.find_element(By.CSS_SELECTOR, 'mark.kds-Price-promotional')
-                    dollars = price_element.find_element(By.CSS_SELECTOR, 'span.kds-Price-promotional-dropCaps').text
-                    cents = price_element.find_element(By.CSS_SELECTOR, 'sup.kds-Price-superscript').text.replace(".", "")
-                    price = f"${dollars}.{cents}"
-                except NoSuchElementException:
-                    price = "Price Not Available"
+                price = "Price Not Available"
+
+            # Kept apart from the regular price so the history and diffs can tell a sale from a price change
+            try:
+                promo_element = self.driver.find_element(By.CSS_SELECTOR, 'mark.kds-Price-promotional')
+                dollars = promo_element.find_element(By.CSS_SELECTOR, 'span.kds-Price-promotional-dropCaps').text
+                cents = promo_element.find_element(By.CSS_SELECTOR, 'sup.kds-Price-superscript').text.replace(".", "")
+                promo = f"${dollars}.{cents}"
+            except NoSuchElementException:
+                promo = ""
 
             try:
                 image_element = self.driver.find_element(By.CSS_SELECTOR, '.ProductImages-image')
@@ -149,6 +189,7 @@ class MarianosScraper:
                 'Title': product_name,
                 'Location': location,
                 'Price': price,
+                'Promo Price': promo,
                 'Image URL': image_url,
                 'Product Link': link
             }
@@ -157,46 +198,72 @@ class MarianosScraper:
             return product_detail
             
         except Exception as e:
+            if is_permanent(e) or isinstance(e, OSError):
+                # A dead session is for the caller to recover, so the link is retried rather than dropped
+                raise
             logger.error(f"Error scraping product details: {e}")
             return None
 
+    async def open_detail_tab(self) -> str:
+        main_window = self.driver.current_window_handle
+
+        # Open a new tab
+        self.driver.execute_script("window.open('');")
+        await asyncio.sleep(2)
+
+        # Switch to the new tab
+        self.driver.switch_to.window(self.driver.window_handles[-1])
+        return main_window
+
+    async def restart_session(self) -> bool:
+        self.close()
+        if not await self.start_detail_session():
+            return False
+        await self.dismiss_popup_if_unguarded()
+        return True
+
     async def process_product_links(self, category_links: List[str]) -> List[Dict]:
         main_window = self.driver.current_window_handle
         category_product_details = []
 
         try:
-            # Open a new tab
-            self.driver.execute_script("window.open('');")
-            await asyncio.sleep(2)
-            
-            # Switch to the new tab
-            self.driver.switch_to.window(self.driver.window_handles[-1])
+            main_window = await self.open_detail_tab()
 
-            for link in category_links:
+            pending = deque(category_links)
+            while pending:
+                link = pending.popleft()
                 try:
                     logger.info(f"Processing link: {link}")
-                    self.driver.get(link)
+                    await self.load_page(link)
                     
                     # Scrape product details
                     product_detail = await self.scrape_product_details(link)
                     
                     if product_detail:
                         category_product_details.append(product_detail)
-                    
-                    # Short random delay between product page visits
-                    await asyncio.sleep(random.uniform(2, 5))
 
                 except Exception as link_error:
                     logger.error(f"Error processing link {link}: {link_error}")
+                    if await self.supervisor.recover(self.driver, self.restart_session):
+                        # Only the link that was in flight is retried; finished links are kept
+                        main_window = await self.open_detail_tab()
+                        pending.appendleft(link)
+                    elif not self.driver:
+                        logger.error(f"No session to continue with, leaving {len(pending)} links unscraped")
+                        break
                     continue
 
         except Exception as e:
             logger.error(f"Critical error in processing links: {e}")
         
         finally:
-            # Close the tab and switch back to main window
-            self.driver.close()
-            self.driver.switch_to.window(main_window)
+            # Close the tab and switch back to main window; a failed restart leaves no driver to clean up
+            if self.driver:
+                try:
+                    self.driver.close()
+                    self.driver.switch_to.window(main_window)
+                except WebDriverException as e:
+                    logger.warning(f"Could not return to the main window: {e}")
 
         return category_product_details
 
@@ -206,8 +273,9 @@ class MarianosScraper:
                 EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
             )
 
+            # Grid links carry a ?fulfillment= query; the canonical form is what detail workers and the catalog key on
             new_links = [
-                container.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
+                canonical_product_url(container.find_element(By.CSS_SELECTOR, 'a').get_attribute('href'))
                 for container in product_containers
             ]
 
@@ -228,20 +296,30 @@ class MarianosScraper:
 
     async def click_load_more(self) -> bool:
         try:
-            load_more_button = WebDriverWait(self.driver, 10).until(
+            load_more_button = await asyncio.to_thread(
+                WebDriverWait(self.driver, 10).until,
                 EC.element_to_be_clickable((By.CSS_SELECTOR, 'button.LoadMore__load-more-button'))
             )
             self.driver.execute_script(
-                "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", 
+                "arguments[0].scrollIntoView({block: 'center'});", 
                 load_more_button
-            )           
-            await asyncio.sleep(random.uniform(1.5, 3.5))
+            )
+            await self.rate.acquire()
+            cells_before = self.grid_cell_count()
+            started = time.monotonic()
             load_more_button.click()
             logger.info("Clicked 'Load More' button")
-            await asyncio.sleep(random.uniform(5, 10))
-            WebDriverWait(self.driver, self.timeout).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
-            )            
+
+            # The time until new cells render is the page latency the rate controller adapts to
+            try:
+                await asyncio.to_thread(
+                    WebDriverWait(self.driver, self.timeout).until,
+                    lambda d: self.grid_cell_count() > cells_before
+                )
+                self.rate.record_success(time.monotonic() - started)
+            except TimeoutException:
+                logger.warning("No new products appeared after clicking 'Load More'")
+                self.rate.record_error(throttled=is_throttled_page(self.driver.title))
             return True
         
         except (TimeoutException, NoSuchElementException):
@@ -252,6 +330,16 @@ class MarianosScraper:
             logger.warning(f"Error clicking 'Load More' button: {e}")
             return False
 
+    def grid_cell_count(self) -> int:
+        return self.driver.execute_script(
+            "return document.querySelectorAll('div[data-testid=\"auto-grid-cell\"]').length;"
+        )
+
+    def wait_until_loaded(self):
+        WebDriverWait(self.driver, self.timeout).until(
+            lambda d: d.execute_script("return document.readyState") == "complete"
+        )
+
     async def search_category(self, category: str) -> bool:
         try:
             try:
@@ -269,43 +357,64 @@ class MarianosScraper:
             )
             search_input.clear()
             await self.type_like_human(search_input, category)
+            await self.rate.acquire()
+            started = time.monotonic()
             search_input.send_keys(Keys.RETURN)
             
             logger.info(f"Searched for category: {category}")
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['search_delay']))
 
-            WebDriverWait(self.driver, self.timeout).until(
-                lambda d: d.execute_script("return document.readyState") == "complete"
+            # Wait for the grid itself rather than a fixed delay, and report how long it took
+            await asyncio.to_thread(self.wait_until_loaded)
+            await asyncio.to_thread(
+                WebDriverWait(self.driver, self.timeout).until,
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="auto-grid-cell"]'))
             )
+            self.rate.record_success(time.monotonic() - started)
             return True
         
         except Exception as e:
             logger.error(f"Error searching for category {category}: {e}")
+            self.rate.record_error()
             return False
 
+    async def restore_grid_offset(self, category: str, page_loads: int) -> bool:
+        return await resume_category_grid(self, category, page_loads)
+
     async def scrape_category(self, category: str) -> List[Dict]:
         if not await self.search_category(category):
-            return []
+            if not await self.supervisor.recover(self.driver, self.restart_session) or not await self.search_category(category):
+                return []
         
         category_product_details = []
         page_loads = 0
         
         while page_loads < SCRAPER_CONFIG['max_page_loads_per_category']:
             # Dismiss any popups
-            await self.dismiss_qualtrics_popup()
+            await self.dismiss_popup_if_unguarded()
             
             # Extract product links for current page
-            current_page_links = self.extract_product_links()
+            current_page_links = await asyncio.to_thread(self.extract_product_links)
             
-            # Process links in a new tab and collect product details
-            page_product_details = await self.process_product_links(current_page_links)
-            category_product_details.extend(page_product_details)
+            if self.link_pipeline:
+                # Hand links straight to the detail workers instead of scraping them here
+                for link in current_page_links:
+                    await self.link_pipeline.put(link)
+            else:
+                # Process links in a new tab and collect product details
+                restarts = self.supervisor.total_restarts
+                page_product_details = await self.process_product_links(current_page_links)
+                category_product_details.extend(page_product_details)
+
+                # A restart during the detail pass lands back on the home page, so the grid is rebuilt
+                if self.supervisor.total_restarts != restarts and not await self.restore_grid_offset(category, page_loads):
+                    break
             
             # Try to click load more button
             if not await self.click_load_more():
+                if await self.supervisor.recover(self.driver, self.restart_session):
+                    if await self.restore_grid_offset(category, page_loads):
+                        continue
                 break
-                
-            await asyncio.sleep(random.uniform(*SCRAPER_CONFIG['load_more_delay']))
             
             page_loads += 1
             logger.info(f"Loaded page {page_loads} for category {category}")
@@ -316,13 +425,35 @@ class MarianosScraper:
     async def setup_driver(self) -> Optional[Chrome]:
         try:
             options = self._setup_driver_options()
-            self.driver = uc.Chrome(options=options)
+            self.driver = await asyncio.to_thread(uc.Chrome, options=options)
+            # Turns a hung driver.get into a TimeoutException instead of blocking forever
+            self.driver.set_page_load_timeout(SCRAPER_CONFIG['page_load_timeout'])
+            # Dismisses the Qualtrics survey as soon as it appears instead of polling for it every page
+            self.popup_guard_installed = install_popup_guard(self.driver)
             logger.info("Driver setup complete")
             return self.driver
         except WebDriverException as e:
             logger.error(f"Error setting up undetectable webdriver: {e}")
             return None
 
+    async def load_page(self, url: str):
+        # Paced by the shared rate controller; the load time it measures is what the rate adapts to
+        await self.rate.acquire()
+        started = time.monotonic()
+        try:
+            await asyncio.to_thread(self.driver.get, url)
+            await asyncio.to_thread(self.wait_until_loaded)
+            if is_throttled_page(self.driver.title):
+                self.rate.record_error(throttled=True)
+                raise ThrottledError(f"Throttled while loading {url}")
+        except ThrottledError:
+            raise
+        except Exception:
+            self.rate.record_error()
+            raise
+
+        self.rate.record_success(time.monotonic() - started)
+
     async def visit_website(self, url: str, max_retries: int = 3) -> bool:
         if not self.driver:
             logger.error("Driver not initialized")
@@ -331,14 +462,8 @@ class MarianosScraper:
         for attempt in range(max_retries):
             try:
                 logger.info(f"Visiting {url}... (Attempt {attempt + 1})")
-                self.driver.get(url)
-
-                WebDriverWait(self.driver, self.timeout).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
-                
+                await self.load_page(url)
                 logger.info(f"Successfully loaded {url}")
-                await asyncio.sleep(random.uniform(2, 5))
                 return True
             
             except Exception as e:
@@ -347,21 +472,48 @@ class MarianosScraper:
                 if attempt == max_retries - 1:
                     logger.error(f"Failed to load {url} after {max_retries} attempts")
                     return False
-                
-                await asyncio.sleep(random.uniform(3, 7))
 
-    async def scrape(self) -> List[Dict]:
+    async def start_detail_session(self) -> bool:
+        if not await self.setup_driver():
+            return False
+        return await self.visit_website(self.base_url)
+
+    async def scrape_link(self, link: str) -> Optional[Dict]:
+        while True:
+            logger.info(f"Processing link: {link}")
+            try:
+                await self.load_page(link)
+                product_detail = await self.scrape_product_details(link)
+            except (WebDriverException, OSError, ThrottledError) as e:
+                logger.error(f"Error loading {link}: {e}")
+                product_detail = None
+
+            # A crashed worker retries just this link on a fresh session instead of failing the rest of the queue
+            if product_detail or not await self.supervisor.recover(self.driver, self.restart_session):
+                break
+
+        return product_detail
+
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.error(f"Error closing WebDriver: {e}")
+            self.driver = None
+
+    async def scrape(self) -> ProductRecords:
+        all_product_details = ProductRecords()
         try:
             driver = await self.setup_driver()
             if not driver:
-                return []
+                return ProductRecords()
             
             if not await self.visit_website(self.base_url):
-                return []
+                return ProductRecords()
 
-            await self.dismiss_qualtrics_popup()
+            await self.dismiss_popup_if_unguarded()
             
-            all_product_details = []
             for category in PRODUCT_CATEGORIES:
                 category_product_details = await self.scrape_category(category)
                 all_product_details.extend(category_product_details)
@@ -370,7 +522,8 @@ class MarianosScraper:
         
         except Exception as e:
             logger.error(f"Critical error during scraping: {e}")
-            return []
+            logger.info(f"Returning {len(all_product_details)} products scraped before the error")
+            return all_product_details
 
         finally:
             if self.driver:
@@ -380,15 +533,53 @@ class MarianosScraper:
                 except Exception as e:
                     logger.error(f"Error closing WebDriver: {e}")
 
-async def main():
-    scraper = MarianosScraper(
+async def scrape_pipelined(detail_workers: int, **scraper_kwargs) -> ProductRecords:
+    discovery = MarianosScraper(**scraper_kwargs)
+    workers = [MarianosScraper(**scraper_kwargs) for _ in range(detail_workers)]
+
+    try:
+        started = await asyncio.gather(*(worker.start_detail_session() for worker in workers))
+        active = [worker for worker, ok in zip(workers, started) if ok]
+        if not active:
+            logger.error("No detail worker could start a session")
+            return ProductRecords()
+
+        pipeline = LinkPipeline(maxsize=SCRAPER_CONFIG['link_queue_size'])
+        discovery.link_pipeline = pipeline
+        return await pipeline.run(discovery.scrape(), [worker.scrape_link for worker in active])
+
+    finally:
+        for worker in workers:
+            worker.close()
+
+async def main(argv: Optional[List[str]] = None):
+    apply_settings(load_settings(argv))
+
+    scraper_kwargs = dict(
         headless=SCRAPER_CONFIG.get('headless', False),
         zip_code=SCRAPER_CONFIG.get('zip_code'),
         timeout=SCRAPER_CONFIG.get('timeout', 30)
     )
-    product_details = await scraper.scrape()
+    if SCRAPER_CONFIG['pipelined_details']:
+        product_details = await scrape_pipelined(SCRAPER_CONFIG['detail_workers'], **scraper_kwargs)
+    else:
+        scraper = MarianosScraper(**scraper_kwargs)
+        product_details = await scraper.scrape()
     if product_details:
         logger.info(f"Scraped {len(product_details)} products successfully")
+        catalog = CatalogStore(SCRAPER_CONFIG['catalog_db'])
+        try:
+            catalog.ingest(product_details, store_id=SCRAPER_CONFIG['store_id'])
+        finally:
+            catalog.close()
+        PriceHistory(SCRAPER_CONFIG['price_history_dir']).append(product_details, store_id=SCRAPER_CONFIG['store_id'])
+
+        # Diff against the previous run before its snapshot is replaced
+        current = product_details.to_dataframe()
+        previous = read_snapshot(SCRAPER_CONFIG['snapshot_file'])
+        if previous is not None:
+            write_report(diff_snapshots(previous, current), SCRAPER_CONFIG['price_report_file'])
+        current.to_csv(SCRAPER_CONFIG['snapshot_file'], index=False)
     else:
         logger.warning("No products were scraped")
 
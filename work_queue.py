@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+try:
+    import redis
+except ImportError:  # only needed for redis:// queues
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class Task(NamedTuple):
+    id: str
+    kind: str
+    payload: Any
+    attempts: int
+
+
+def _key(payload: Any) -> str:
+    # The canonical JSON form doubles as the dedupe key, so re-enqueueing the same work is a no-op
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'))
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, payload)
+);
+
+CREATE INDEX IF NOT EXISTS tasks_claimable ON tasks (kind, state, lease_expires);
+"""
+
+
+class SQLiteWorkQueue:
+    """Lease-based task queue in one SQLite file; every state change is committed, so restarts lose nothing."""
+
+    def __init__(self, path: str, lease_seconds: float = 120, max_attempts: int = 3, run: str = ''):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.run = run
+        # Callers run queue operations in worker threads; the lock keeps their transactions from interleaving
+        self.conn = sqlite3.connect(os.path.expanduser(path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def _scoped(self, kind: str) -> str:
+        # Tasks of different runs live side by side in the kind column, so a new run does not collide with old ones
+        return f'{self.run}/{kind}' if self.run else kind
+
+    def enqueue(self, kind: str, payloads: Iterable[Any]) -> int:
+        with self._lock:
+            return self._enqueue(self._scoped(kind), payloads)
+
+    def _enqueue(self, kind: str, payloads: Iterable[Any]) -> int:
+        now = time.time()
+        rows = [(kind, _key(payload), now) for payload in payloads]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO tasks (kind, payload, updated_at) VALUES (?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def claim(self, worker_id: str, kind: str) -> Optional[Task]:
+        with self._lock:
+            row = self._claim(worker_id, self._scoped(kind))
+        if not row:
+            return None
+        return Task(str(row[0]), kind, json.loads(row[1]), row[2] + 1)
+
+    def _claim(self, worker_id: str, kind: str) -> Optional[tuple]:
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same row
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A lease that expired on its last allowed attempt means the task keeps killing workers; stop handing it out
+            self.conn.execute(
+                """
+                UPDATE tasks SET state = 'failed', owner = NULL, lease_expires = NULL, last_error = 'lease expired', updated_at = ?
+                WHERE kind = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, kind, now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                """
+                SELECT id, payload, attempts FROM tasks
+                WHERE kind = ? AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+                ORDER BY id LIMIT 1
+                """,
+                (kind, now)
+            ).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, row[0])
+                )
+            self.conn.execute("COMMIT")
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _update(self, sql: str, params: tuple) -> bool:
+        with self._lock:
+            return self.conn.execute(sql, params).rowcount == 1
+
+    def heartbeat(self, task: Task, worker_id: str) -> bool:
+        now = time.time()
+        return self._update(
+            "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+            (now + self.lease_seconds, now, int(task.id), worker_id)
+        )
+
+    def complete(self, task: Task, worker_id: str, result: Any = None) -> bool:
+        return self._update(
+            "UPDATE tasks SET state = 'done', result = ?, lease_expires = NULL, updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+            (json.dumps(result), time.time(), int(task.id), worker_id)
+        )
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        state = 'failed' if task.attempts >= self.max_attempts else 'pending'
+        return self._update(
+            "UPDATE tasks SET state = ?, owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+            (state, error, time.time(), int(task.id), worker_id)
+        )
+
+    def results(self, kind: str) -> List[Any]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT result FROM tasks WHERE kind = ? AND state = 'done' ORDER BY id", (self._scoped(kind),)
+            ).fetchall()
+        return [json.loads(result) for (result,) in rows]
+
+    def counts(self, kind: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE kind = ? GROUP BY state", (self._scoped(kind),)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# Moves expired leases back to pending (or to failed once attempts are used up), then pops the
+# next task and leases it, atomically on the server
+REDIS_CLAIM_SCRIPT = """
+local prefix, kind, worker, now, lease = KEYS[1], ARGV[1], ARGV[2], tonumber(ARGV[3]), tonumber(ARGV[4])
+local max_attempts = tonumber(ARGV[5])
+local pending, leases = prefix .. ':pending:' .. kind, prefix .. ':leases:' .. kind
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', leases, '-inf', now)) do
+    local expired = prefix .. ':task:' .. id
+    redis.call('ZREM', leases, id)
+    if tonumber(redis.call('HGET', expired, 'attempts')) >= max_attempts then
+        redis.call('HSET', expired, 'state', 'failed', 'owner', '', 'last_error', 'lease expired')
+    else
+        redis.call('HSET', expired, 'state', 'pending', 'owner', '')
+        redis.call('RPUSH', pending, id)
+    end
+end
+local id = redis.call('LPOP', pending)
+if not id then return nil end
+local task = prefix .. ':task:' .. id
+redis.call('ZADD', leases, now + lease, id)
+redis.call('HSET', task, 'owner', worker, 'state', 'leased')
+local attempts = redis.call('HINCRBY', task, 'attempts', 1)
+return {id, redis.call('HGET', task, 'payload'), attempts}
+"""
+
+REDIS_ENQUEUE_SCRIPT = """
+local task = KEYS[1]
+if redis.call('EXISTS', task) == 1 then return 0 end
+redis.call('HSET', task, 'kind', ARGV[1], 'payload', ARGV[2], 'state', 'pending', 'attempts', 0)
+redis.call('SADD', KEYS[2], ARGV[3])
+redis.call('RPUSH', KEYS[3], ARGV[3])
+return 1
+"""
+
+# Only the current lease holder may extend, finish or release a task
+REDIS_OWNED_UPDATE_SCRIPT = """
+local task, leases = KEYS[1], KEYS[2]
+if redis.call('HGET', task, 'owner') ~= ARGV[1] or redis.call('HGET', task, 'state') ~= 'leased' then
+    return 0
+end
+local action = ARGV[2]
+if action == 'heartbeat' then
+    redis.call('ZADD', leases, ARGV[3], ARGV[4])
+    return 1
+end
+redis.call('ZREM', leases, ARGV[4])
+redis.call('HSET', task, 'state', ARGV[3], 'owner', '', ARGV[5], ARGV[6])
+if ARGV[3] == 'pending' then
+    redis.call('RPUSH', KEYS[3], ARGV[4])
+elseif ARGV[3] == 'done' then
+    redis.call('RPUSH', KEYS[4], ARGV[4])
+end
+return 1
+"""
+
+
+class RedisWorkQueue:
+    """The same lease protocol on a Redis-compatible server; durability follows the server's persistence settings."""
+
+    def __init__(self, url: str, prefix: str = 'mariano', lease_seconds: float = 120, max_attempts: int = 3,
+                 run: str = ''):
+        if redis is None:
+            raise RuntimeError("redis:// work queues need the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = f'{prefix}:{run}' if run else prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._enqueue = self.client.register_script(REDIS_ENQUEUE_SCRIPT)
+        self._claim = self.client.register_script(REDIS_CLAIM_SCRIPT)
+        self._owned_update = self.client.register_script(REDIS_OWNED_UPDATE_SCRIPT)
+
+    def _keys(self, kind: str, task_id: str) -> List[str]:
+        return [
+            f'{self.prefix}:task:{task_id}',
+            f'{self.prefix}:leases:{kind}',
+            f'{self.prefix}:pending:{kind}',
+            f'{self.prefix}:done:{kind}'
+        ]
+
+    def enqueue(self, kind: str, payloads: Iterable[Any]) -> int:
+        added = 0
+        for payload in payloads:
+            key = _key(payload)
+            # Ids derive from the payload, so every node enqueueing the same work maps to one task
+            task_id = f"{kind}:{hashlib.sha1(key.encode()).hexdigest()}"
+            keys = [f'{self.prefix}:task:{task_id}', f'{self.prefix}:tasks:{kind}', f'{self.prefix}:pending:{kind}']
+            added += self._enqueue(keys=keys, args=[kind, key, task_id])
+        return added
+
+    def claim(self, worker_id: str, kind: str) -> Optional[Task]:
+        claimed = self._claim(keys=[self.prefix], args=[kind, worker_id, time.time(), self.lease_seconds, self.max_attempts])
+        if not claimed:
+            return None
+        task_id, payload, attempts = claimed
+        return Task(task_id, kind, json.loads(payload), int(attempts))
+
+    def heartbeat(self, task: Task, worker_id: str) -> bool:
+        args = [worker_id, 'heartbeat', time.time() + self.lease_seconds, task.id]
+        return bool(self._owned_update(keys=self._keys(task.kind, task.id), args=args))
+
+    def complete(self, task: Task, worker_id: str, result: Any = None) -> bool:
+        args = [worker_id, 'done', 'done', task.id, 'result', json.dumps(result)]
+        return bool(self._owned_update(keys=self._keys(task.kind, task.id), args=args))
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        state = 'failed' if task.attempts >= self.max_attempts else 'pending'
+        args = [worker_id, 'fail', state, task.id, 'last_error', error]
+        return bool(self._owned_update(keys=self._keys(task.kind, task.id), args=args))
+
+    def _fields(self, task_ids: Iterable[str], field: str) -> List[Optional[str]]:
+        # One round trip for the whole batch instead of one per task
+        pipe = self.client.pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.hget(f'{self.prefix}:task:{task_id}', field)
+        return pipe.execute()
+
+    def results(self, kind: str) -> List[Any]:
+        done = self.client.lrange(f'{self.prefix}:done:{kind}', 0, -1)
+        return [json.loads(result) for result in self._fields(done, 'result') if result is not None]
+
+    def counts(self, kind: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for state in self._fields(self.client.smembers(f'{self.prefix}:tasks:{kind}'), 'state'):
+            state = state or 'pending'
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def close(self):
+        self.client.close()
+
+
+def open_work_queue(url: str, lease_seconds: float = 120, max_attempts: int = 3, run: str = ''):
+    """sqlite:///path/to/queue.db or redis://host:port/db; nodes of one crawl pass the same run id."""
+    parts = urlsplit(url)
+    if parts.scheme == 'sqlite':
+        return SQLiteWorkQueue(url[len('sqlite:///'):], lease_seconds, max_attempts, run)
+    if parts.scheme in ('redis', 'rediss'):
+        return RedisWorkQueue(url, lease_seconds=lease_seconds, max_attempts=max_attempts, run=run)
+    raise ValueError(f"Unsupported work queue URL: {url}")
+
+
+class LeaseKeeper:
+    """Heartbeats a claimed task in the background for as long as the block runs."""
+
+    def __init__(self, queue, task: Task, worker_id: str):
+        self.queue = queue
+        self.task = task
+        self.worker_id = worker_id
+        self.lost = False
+        self._heartbeats: Optional[asyncio.Task] = None
+
+    async def _beat(self):
+        interval = self.queue.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, self.task, self.worker_id):
+                # Another worker took the task over after our lease expired; our result will be discarded
+                self.lost = True
+                logger.warning(f"Lost lease on task {self.task.id}")
+                return
+
+    async def __aenter__(self) -> 'LeaseKeeper':
+        self._heartbeats = asyncio.create_task(self._beat())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._heartbeats.cancel()